@@ -21,8 +21,11 @@ import h5py
 import sys
 from pathlib import Path
 
+from odor_frame_store import read_store_frame
+
 # Configuration
 VIZ_DIR = "viz_eel2d_Str"
+FRAME_STORE = "frame_store"  # Consolidated frames (odor_frame_store.py); used when present
 OUTPUT_DIR = "odor_analysis"
 FISH_FILES = ["geometry/eel2d_1.vertex", "geometry/eel2d_2.vertex", "geometry/eel2d_3.vertex", "geometry/eel2d_4.vertex"]
 
@@ -110,26 +113,31 @@ def plot_odor_isocontours(iteration):
     """
     Path(OUTPUT_DIR).mkdir(exist_ok=True)
 
-    visit_file = f"{VIZ_DIR}/dumps.visit.{iteration:05d}.silo"
-
-    if not os.path.exists(visit_file):
-        print(f"File not found: {visit_file}")
-        return
+    # Load data: frame store (memory-mapped), else the Silo dump
+    frame = read_store_frame(FRAME_STORE, ('C',), ('Omega',), iteration=iteration)
+    if frame is not None:
+        C_data, x, y = frame['C'], frame['x'], frame['y']
+        omega = frame.get('Omega')
+    else:
+        visit_file = f"{VIZ_DIR}/dumps.visit.{iteration:05d}.silo"
 
-    # Load data
-    with h5py.File(visit_file, 'r') as f:
-        if 'C' not in f.keys():
-            print("Odor concentration not found in output")
+        if not Path(visit_file).exists():
+            print(f"File not found: {visit_file}")
             return
 
-        C_data = f['C'][:]
-        x = f['x'][:]
-        y = f['y'][:]
+        with h5py.File(visit_file, 'r') as f:
+            if 'C' not in f.keys():
+                print("Odor concentration not found in output")
+                return
 
-        if 'Omega' in f.keys():
-            omega = f['Omega'][:]
-        else:
-            omega = None
+            C_data = f['C'][:]
+            x = f['x'][:]
+            y = f['y'][:]
+
+            if 'Omega' in f.keys():
+                omega = f['Omega'][:]
+            else:
+                omega = None
 
     # Normalize
     C_star = normalize_concentration(C_data)
@@ -242,22 +250,27 @@ def analyze_odor_statistics(iterations):
 
     for iteration in iterations:
         visit_file = f"{VIZ_DIR}/dumps.visit.{iteration:05d}.silo"
+        frame = read_store_frame(FRAME_STORE, ('C',), ('Omega',), iteration=iteration)
 
-        if not Path(visit_file).exists():
+        if frame is None and not Path(visit_file).exists():
             continue
 
         try:
-            with h5py.File(visit_file, 'r') as f:
-                C_data = f['C'][:]
-                x = f['x'][:]
-                y = f['y'][:]
-
-                if 'time' in f.attrs:
-                    t = f.attrs['time']
-                else:
-                    t = iteration * 0.0001  # Approximate from dt
-
-                omega = f['Omega'][:] if 'Omega' in f.keys() else None
+            if frame is not None:
+                C_data, x, y, t = frame['C'], frame['x'], frame['y'], frame['time']
+                omega = frame.get('Omega')
+            else:
+                with h5py.File(visit_file, 'r') as f:
+                    C_data = f['C'][:]
+                    x = f['x'][:]
+                    y = f['y'][:]
+
+                    if 'time' in f.attrs:
+                        t = f.attrs['time']
+                    else:
+                        t = iteration * 0.0001  # Approximate from dt
+
+                    omega = f['Omega'][:] if 'Omega' in f.keys() else None
 
             C_star = normalize_concentration(C_data)
 
@@ -0,0 +1,743 @@
+#!/usr/bin/env python3
+"""
+Block-Structured Adaptive Mesh Refinement for Odor Transport
+
+Refines OdorTransportSolverCN locally, following the patch hierarchy
+that IBAMR uses for the flow (MAX_LEVELS levels, REF_RATIO between
+levels, gradient/vorticity tagging):
+
+    level 0   : the uniform OdorTransportSolverCN grid (any solver backend)
+    level 1.. : rectangular patches, each refining a box of its parent by
+                ref_ratio in both directions
+
+Every coarse node i is the centre of a control volume
+[x_i - Δx/2, x_i + Δx/2] (this is what get_total_mass() integrates).
+A patch splits each control volume of its box into ref_ratio² cells
+(cell-centred, like IBAMR), so data moves between levels conservatively:
+
+- Prolongation (new patches): limited linear reconstruction in every
+  parent cell (minmod slopes). Its average over the fine cells equals the
+  parent value, and it does not create negative concentrations.
+- Restriction (after every step): each covered parent value is replaced
+  by the mean of its fine cells. The composite mass is therefore the
+  level-0 mass.
+
+Time stepping subcycles: a level-ℓ patch takes ref_ratio Crank-Nicolson
+steps of Δt/ref_ratio per parent step, so the fine CFL number equals the
+coarse one. Ghost values around a patch are interpolated from the parent
+(bilinear in space, linear in time) and enter the implicit solve as
+inhomogeneous Dirichlet data. The coarse-fine flux mismatch of every
+parent step is refluxed in lumped form (the difference between the fine
+and the coarse mass change of a patch is returned to the uncovered parent
+cells around it), so the composite mass changes exactly as on level 0.
+
+Cells are tagged where the concentration jump per cell exceeds
+grad_tol·max(C) or where |ω| exceeds vorticity_tol, the tags are grown
+by tag_buffer cells, and tagged blocks of block_size parent cells are
+merged into rectangular patches. Refinement stays one parent cell away
+from the edge of the parent, so patches are properly nested and never
+touch the physical boundary.
+"""
+
+import numpy as np
+from scipy.ndimage import binary_dilation, map_coordinates
+
+from odor_transport_solver_CN import (
+    FactorizationCache,
+    OdorTransportSolverCN,
+    UpwindConvectionKernel,
+    apply_laplacian,
+    build_laplacian_2d,
+)
+
+
+def _minmod(a, b):
+    """Minmod limiter: the smaller slope if a and b agree in sign, else 0."""
+    return np.where(a * b > 0.0, np.where(np.abs(a) < np.abs(b), a, b), 0.0)
+
+
+def prolong_conservative(parent_c, box, ref_ratio):
+    """
+    Limited linear prolongation of a parent box onto ref_ratio² cells each.
+
+    Parameters:
+    -----------
+    parent_c : ndarray (ny_parent, nx_parent)
+        Parent data; box must stay one cell away from its edge
+    box : tuple (j0, j1, i0, i1)
+        Parent cells [j0, j1) × [i0, i1) to refine
+    ref_ratio : int
+        Refinement ratio
+
+    Returns:
+    --------
+    fine : ndarray ((j1-j0)·ref_ratio, (i1-i0)·ref_ratio)
+        Fine data whose ref_ratio × ref_ratio block means reproduce the box
+    """
+    j0, j1, i0, i1 = box
+    c = parent_c[j0:j1, i0:i1]
+    slope_x = _minmod(parent_c[j0:j1, i0 + 1:i1 + 1] - c, c - parent_c[j0:j1, i0 - 1:i1 - 1])
+    slope_y = _minmod(parent_c[j0 + 1:j1 + 1, i0:i1] - c, c - parent_c[j0 - 1:j1 - 1, i0:i1])
+
+    # Fine cell centre offsets within a parent cell (parent index units),
+    # symmetric about zero so the block mean is the parent value
+    offsets = (np.arange(ref_ratio) + 0.5) / ref_ratio - 0.5
+    fine = (c[:, None, :, None]
+            + slope_y[:, None, :, None] * offsets[None, :, None, None]
+            + slope_x[:, None, :, None] * offsets[None, None, None, :])
+    return fine.reshape(c.shape[0] * ref_ratio, c.shape[1] * ref_ratio)
+
+
+def restrict_conservative(fine, ref_ratio):
+    """Mean of every ref_ratio × ref_ratio block of fine cells."""
+    ny, nx = fine.shape
+    return fine.reshape(ny // ref_ratio, ref_ratio, nx // ref_ratio, ref_ratio).mean(axis=(1, 3))
+
+
+def cluster_tags(tags, block_size):
+    """
+    Cover tagged cells with rectangular boxes of whole blocks.
+
+    The interior [1, n-1) of the tag array is tiled with block_size ×
+    block_size blocks; blocks holding a tag are merged greedily into
+    rectangles (runs along x, then extended along y while the same run is
+    tagged).
+
+    Parameters:
+    -----------
+    tags : ndarray of bool (ny, nx)
+        Tagged cells (the outer ring is ignored)
+    block_size : int
+        Block edge length in cells
+
+    Returns:
+    --------
+    boxes : list of tuple (j0, j1, i0, i1)
+        Disjoint boxes in the index space of tags
+    """
+    ny, nx = tags.shape
+    nby = -(-(ny - 2) // block_size)
+    nbx = -(-(nx - 2) // block_size)
+    if nby <= 0 or nbx <= 0:
+        return []
+
+    padded = np.zeros((nby * block_size, nbx * block_size), dtype=bool)
+    padded[:ny - 2, :nx - 2] = tags[1:-1, 1:-1]
+    flagged = padded.reshape(nby, block_size, nbx, block_size).any(axis=(1, 3))
+
+    boxes = []
+    used = np.zeros_like(flagged)
+    for bj in range(nby):
+        for bi in range(nbx):
+            if not flagged[bj, bi] or used[bj, bi]:
+                continue
+            bi_end = bi + 1
+            while bi_end < nbx and flagged[bj, bi_end] and not used[bj, bi_end]:
+                bi_end += 1
+            bj_end = bj + 1
+            while bj_end < nby and np.all(flagged[bj_end, bi:bi_end] & ~used[bj_end, bi:bi_end]):
+                bj_end += 1
+            used[bj:bj_end, bi:bi_end] = True
+            boxes.append((1 + bj * block_size, min(1 + bj_end * block_size, ny - 1),
+                          1 + bi * block_size, min(1 + bi_end * block_size, nx - 1)))
+    return boxes
+
+
+class AMRPatch:
+    """
+    One refined rectangular patch of cell-centred data.
+
+    Attributes:
+    -----------
+    level : int
+        Refinement level (≥ 1)
+    box : tuple (j0, j1, i0, i1)
+        Refined cells in the parent's index space
+    parent : AMRPatch or None
+        Parent patch (None for the level-0 grid)
+    global_offset : tuple (gj0, gi0)
+        Index of the first cell in the level's global index space
+    c : ndarray (ny, nx)
+        Concentration
+    x, y : ndarray
+        Cell centre coordinates
+    children : list of AMRPatch
+        Patches on the next level nested in this one
+    """
+
+    def __init__(self, level, box, parent, ref_ratio, x_origin, y_origin, dx, dy):
+        """
+        Parameters:
+        -----------
+        level : int
+            Refinement level
+        box : tuple (j0, j1, i0, i1)
+            Parent cells to refine
+        parent : AMRPatch or None
+            Parent patch (None: the level-0 grid)
+        ref_ratio : int
+            Refinement ratio
+        x_origin, y_origin : float
+            Lower-left corner of the level-0 control volumes
+        dx, dy : float
+            Cell size on this level
+        """
+        j0, j1, i0, i1 = box
+        self.level = level
+        self.box = box
+        self.parent = parent
+        self.ny = (j1 - j0) * ref_ratio
+        self.nx = (i1 - i0) * ref_ratio
+        self.dx, self.dy = dx, dy
+
+        parent_gj0, parent_gi0 = (0, 0) if parent is None else parent.global_offset
+        self.global_offset = ((parent_gj0 + j0) * ref_ratio, (parent_gi0 + i0) * ref_ratio)
+
+        gj0, gi0 = self.global_offset
+        self.x = x_origin + (gi0 + np.arange(self.nx) + 0.5) * dx
+        self.y = y_origin + (gj0 + np.arange(self.ny) + 0.5) * dy
+
+        self.c = np.zeros((self.ny, self.nx))
+        self.children = []
+
+        # Padded arrays (one ghost cell each side) and the parent-index
+        # coordinates of the ghost ring
+        self._ring = np.zeros((self.ny + 2, self.nx + 2), dtype=bool)
+        self._ring[[0, -1], :] = True
+        self._ring[:, [0, -1]] = True
+        k_y, k_x = np.nonzero(self._ring)
+        self._ring_coords = np.array([j0 - 0.5 + (k_y - 0.5) / ref_ratio,
+                                      i0 - 0.5 + (k_x - 0.5) / ref_ratio])
+        self._padded = np.zeros((self.ny + 2, self.nx + 2))
+        self._ghost_new = np.zeros((self.ny + 2, self.nx + 2))
+        self.u_x = np.zeros((self.ny + 2, self.nx + 2))
+        self.u_y = np.zeros((self.ny + 2, self.nx + 2))
+
+    @property
+    def n_cells(self):
+        return self.nx * self.ny
+
+    def padded_centres(self):
+        """Cell centres of the padded (ny+2, nx+2) grid, as (X, Y)."""
+        x = np.concatenate(([self.x[0] - self.dx], self.x, [self.x[-1] + self.dx]))
+        y = np.concatenate(([self.y[0] - self.dy], self.y, [self.y[-1] + self.dy]))
+        return np.meshgrid(x, y)
+
+    def sample_ring(self, parent_c):
+        """Bilinear interpolation of parent data at the ghost ring."""
+        return map_coordinates(parent_c, self._ring_coords, order=1, mode='nearest')
+
+    def global_box(self):
+        """(gj0, gj1, gi0, gi1) of this patch in its level's index space."""
+        gj0, gi0 = self.global_offset
+        return gj0, gj0 + self.ny, gi0, gi0 + self.nx
+
+
+class OdorAMRSolverCN:
+    """
+    Crank-Nicolson odor transport on a block-structured AMR hierarchy.
+
+    Level 0 is a full OdorTransportSolverCN; finer levels are AMRPatch
+    objects advanced with the same discretization (upwind convection,
+    Crank-Nicolson diffusion) on their own grid, with subcycling in time.
+    """
+
+    def __init__(self, x_range, y_range, nx, ny, diffusion_coeff,
+                 boundary_type='neumann', schmidt_number=None,
+                 max_levels=3, ref_ratio=4, grad_tol=0.05, vorticity_tol=None,
+                 tag_buffer=1, block_size=8, regrid_interval=10,
+                 solver_backend='direct', convection_backend='numpy',
+                 cache_operators=True, operator_cache_dir=None,
+                 factorization_cache_mb=512.0):
+        """
+        Initialize the AMR solver.
+
+        Parameters:
+        -----------
+        x_range, y_range : tuple
+            Domain bounds
+        nx, ny : int
+            Level-0 grid points
+        diffusion_coeff : float
+            Molecular diffusion coefficient D
+        boundary_type : str
+            'neumann' (default), 'dirichlet' or 'periodic' (level 0)
+        schmidt_number : float, optional
+            Schmidt number Sc = ν/D for reference
+        max_levels : int
+            Number of levels including level 0 (IBAMR MAX_LEVELS)
+        ref_ratio : int
+            Refinement ratio between levels (IBAMR REF_RATIO)
+        grad_tol : float or None
+            Tag cells whose concentration jump per cell exceeds
+            grad_tol·max(C); None disables gradient tagging
+        vorticity_tol : float or None
+            Tag cells with |ω| above this value; None disables vorticity
+            tagging
+        tag_buffer : int
+            Cells added around tagged cells before clustering
+        block_size : int
+            Patch granularity in parent cells
+        regrid_interval : int
+            Level-0 steps between regrids (0 disables automatic regridding)
+        solver_backend, convection_backend : str
+            Passed to the level-0 OdorTransportSolverCN
+        cache_operators, operator_cache_dir, factorization_cache_mb :
+            Passed to the level-0 OdorTransportSolverCN
+        """
+        if max_levels < 1:
+            raise ValueError(f"max_levels must be >= 1, got {max_levels}")
+        if ref_ratio < 2:
+            raise ValueError(f"ref_ratio must be >= 2, got {ref_ratio}")
+
+        self.base = OdorTransportSolverCN(x_range, y_range, nx, ny, diffusion_coeff,
+                                          boundary_type=boundary_type,
+                                          schmidt_number=schmidt_number,
+                                          cache_operators=cache_operators,
+                                          operator_cache_dir=operator_cache_dir,
+                                          factorization_cache_mb=factorization_cache_mb,
+                                          convection_backend=convection_backend,
+                                          solver_backend=solver_backend)
+        self.D = diffusion_coeff
+        self.theta = self.base.theta
+        self.max_levels = max_levels
+        self.ref_ratio = ref_ratio
+        self.grad_tol = grad_tol
+        self.vorticity_tol = vorticity_tol
+        self.tag_buffer = tag_buffer
+        self.block_size = block_size
+        self.regrid_interval = regrid_interval
+        self.convection_backend = convection_backend
+        self.factorization_cache_mb = factorization_cache_mb
+
+        # Level-0 control volumes start half a cell before the first node
+        self._x_origin = self.base.x_min - 0.5 * self.base.dx
+        self._y_origin = self.base.y_min - 0.5 * self.base.dy
+
+        # levels[ℓ-1] holds the patches of level ℓ
+        self.levels = [[] for _ in range(max_levels - 1)]
+
+        self._u_x = np.zeros((ny, nx))
+        self._u_y = np.zeros((ny, nx))
+        self._velocity_sampler = None
+
+        # Per patch shape: Dirichlet Laplacian factorizations and kernels
+        self._factorizations = {}
+        self._kernels = {}
+        self.regrid_count = 0
+
+        print(f"[AMR-CN] Adaptive mesh refinement enabled")
+        print(f"  Levels: {max_levels}, refinement ratio {ref_ratio}")
+        print(f"  Finest resolution: Δx = {self.base.dx / ref_ratio**(max_levels - 1):.5f}")
+
+    # --------------------------------------------------------
+    # Properties and helpers
+    # --------------------------------------------------------
+
+    @property
+    def t(self):
+        return self.base.t
+
+    @property
+    def total_steps(self):
+        return self.base.total_steps
+
+    def _level_spacing(self, level):
+        factor = self.ref_ratio ** level
+        return self.base.dx / factor, self.base.dy / factor
+
+    def _patches(self):
+        for level_patches in self.levels:
+            yield from level_patches
+
+    def _factorization(self, patch):
+        key = (patch.ny, patch.nx, patch.level)
+        cache = self._factorizations.get(key)
+        if cache is None:
+            # Dirichlet operator: ghost values enter through the RHS
+            L = build_laplacian_2d(patch.nx, patch.ny, patch.dx, patch.dy, 'dirichlet')
+            cache = FactorizationCache(L, self.D * self.theta, self.factorization_cache_mb)
+            self._factorizations[key] = cache
+        return cache
+
+    def _kernel(self, patch):
+        key = (patch.ny, patch.nx, patch.level)
+        kernel = self._kernels.get(key)
+        if kernel is None:
+            kernel = UpwindConvectionKernel(patch.ny + 2, patch.nx + 2, patch.dx, patch.dy,
+                                            self.convection_backend)
+            self._kernels[key] = kernel
+        return kernel
+
+    def _sample_velocity(self, patch):
+        """Velocity at the padded cell centres of a patch."""
+        X, Y = patch.padded_centres()
+        if self._velocity_sampler is not None:
+            patch.u_x[...], patch.u_y[...] = self._velocity_sampler(X, Y)
+            return
+        # Bilinear interpolation of the level-0 velocity
+        coords = np.array([(Y - self.base.y_min) / self.base.dy,
+                           (X - self.base.x_min) / self.base.dx])
+        patch.u_x[...] = map_coordinates(self._u_x, coords, order=1, mode='nearest')
+        patch.u_y[...] = map_coordinates(self._u_y, coords, order=1, mode='nearest')
+
+    # --------------------------------------------------------
+    # Tagging and regridding
+    # --------------------------------------------------------
+
+    def _tag_cells(self, c_field, u_x, u_y, dx, dy, c_scale):
+        """Cells to refine on one grid (gradient and vorticity criteria)."""
+        tags = np.zeros(c_field.shape, dtype=bool)
+
+        if self.grad_tol is not None and c_scale > 0.0:
+            dc_dy, dc_dx = np.gradient(c_field)
+            tags |= np.hypot(dc_dx, dc_dy) > self.grad_tol * c_scale
+
+        if self.vorticity_tol is not None:
+            omega = np.gradient(u_y, dx, axis=1) - np.gradient(u_x, dy, axis=0)
+            tags |= np.abs(omega) > self.vorticity_tol
+
+        if self.tag_buffer > 0 and tags.any():
+            tags = binary_dilation(tags, iterations=self.tag_buffer)
+        return tags
+
+    def regrid(self):
+        """
+        Rebuild the patch hierarchy from the current tags.
+
+        New patches are filled by conservative prolongation from their
+        parent, then overwritten with the old fine data where old and new
+        patches of the same level overlap.
+        """
+        old_levels = self.levels
+        c_scale = float(np.max(self.base.c))
+        self.levels = [[] for _ in range(self.max_levels - 1)]
+
+        parents = [None]
+        for level in range(1, self.max_levels):
+            dx, dy = self._level_spacing(level)
+            dx_parent, dy_parent = self._level_spacing(level - 1)
+            new_patches = []
+            for parent in parents:
+                if parent is None:
+                    parent_c, u_x, u_y = self.base.c, self._u_x, self._u_y
+                else:
+                    parent_c = parent.c
+                    u_x, u_y = parent.u_x[1:-1, 1:-1], parent.u_y[1:-1, 1:-1]
+                    parent.children = []
+
+                tags = self._tag_cells(parent_c, u_x, u_y, dx_parent, dy_parent, c_scale)
+                for box in cluster_tags(tags, self.block_size):
+                    patch = AMRPatch(level, box, parent, self.ref_ratio,
+                                     self._x_origin, self._y_origin, dx, dy)
+                    patch.c[...] = prolong_conservative(parent_c, box, self.ref_ratio)
+                    np.maximum(patch.c, 0.0, out=patch.c)
+                    self._copy_overlap(patch, old_levels[level - 1])
+                    self._sample_velocity(patch)
+                    if parent is not None:
+                        parent.children.append(patch)
+                    new_patches.append(patch)
+
+            self.levels[level - 1] = new_patches
+            if not new_patches:
+                break
+            parents = new_patches
+
+        self.regrid_count += 1
+
+    @staticmethod
+    def _copy_overlap(patch, old_patches):
+        gj0, gj1, gi0, gi1 = patch.global_box()
+        for old in old_patches:
+            oj0, oj1, oi0, oi1 = old.global_box()
+            j_lo, j_hi = max(gj0, oj0), min(gj1, oj1)
+            i_lo, i_hi = max(gi0, oi0), min(gi1, oi1)
+            if j_lo < j_hi and i_lo < i_hi:
+                patch.c[j_lo - gj0:j_hi - gj0, i_lo - gi0:i_hi - gi0] = \
+                    old.c[j_lo - oj0:j_hi - oj0, i_lo - oi0:i_hi - oi0]
+
+    def _restrict_into(self, patch, parent_c):
+        j0, j1, i0, i1 = patch.box
+        parent_c[j0:j1, i0:i1] = restrict_conservative(patch.c, self.ref_ratio)
+
+    # --------------------------------------------------------
+    # Initial conditions
+    # --------------------------------------------------------
+
+    def set_initial_condition_gaussian(self, x0, y0, sigma, amplitude=1.0):
+        """
+        Gaussian initial condition, evaluated at the cell centres of every level.
+
+        C(x,y,0) = A * exp(-((x-x0)² + (y-y0)²) / (2σ²))
+        """
+        def gaussian(X, Y):
+            return amplitude * np.exp(-((X - x0)**2 + (Y - y0)**2) / (2 * sigma**2))
+
+        self.base.set_initial_condition_gaussian(x0, y0, sigma, amplitude)
+        self.levels = [[] for _ in range(self.max_levels - 1)]
+        # One pass per level: each regrid can only add the next finer level
+        for _ in range(self.max_levels - 1):
+            self.regrid()
+            for patch in self._patches():
+                X, Y = np.meshgrid(patch.x, patch.y)
+                patch.c[...] = gaussian(X, Y)
+        self._restrict_all()
+        self.base.mass_initial = self.base.get_total_mass()
+
+    def set_initial_condition_custom(self, concentration_field):
+        """Set the level-0 field and refine it by prolongation."""
+        self.base.set_initial_condition_custom(concentration_field)
+        self.levels = [[] for _ in range(self.max_levels - 1)]
+        for _ in range(self.max_levels - 1):
+            self.regrid()
+
+    def _restrict_all(self):
+        for level_patches in reversed(self.levels):
+            for patch in level_patches:
+                parent_c = self.base.c if patch.parent is None else patch.parent.c
+                self._restrict_into(patch, parent_c)
+
+    # --------------------------------------------------------
+    # Time stepping
+    # --------------------------------------------------------
+
+    def compute_stable_timestep(self, u_x, u_y, cfl_max=0.5):
+        """
+        Level-0 CFL timestep; subcycling keeps every level at the same CFL.
+        """
+        return self.base.compute_stable_timestep(u_x, u_y, cfl_max)
+
+    def set_velocity_sampler(self, sampler):
+        """
+        Sample the velocity for refined patches from a callable.
+
+        Parameters:
+        -----------
+        sampler : callable or None
+            sampler(X, Y) -> (u_x, u_y) at arbitrary points, e.g. built
+            from the scattered IBAMR velocity; None reverts to bilinear
+            interpolation of the level-0 velocity
+        """
+        self._velocity_sampler = sampler
+
+    def step_crank_nicolson(self, u_x, u_y, dt):
+        """
+        Advance the whole hierarchy by one level-0 timestep.
+
+        Parameters:
+        -----------
+        u_x, u_y : ndarray (ny, nx)
+            Level-0 velocity field at current time
+        dt : float
+            Level-0 timestep size (level ℓ takes ref_ratio^ℓ substeps)
+        """
+        self._u_x[...] = u_x
+        self._u_y[...] = u_y
+        for patch in self._patches():
+            self._sample_velocity(patch)
+
+        c_old = self.base.c.copy()
+        self.base.step_crank_nicolson(u_x, u_y, dt)
+
+        level_one = self.levels[0] if self.levels else []
+        self._advance_children(level_one, c_old, self.base.c, dt)
+
+        if self.regrid_interval and self.base.total_steps % self.regrid_interval == 0:
+            self.regrid()
+
+    def _advance_children(self, patches, parent_old, parent_new, dt_parent):
+        """
+        Advance the patches nested in one parent over one parent step.
+
+        Afterwards each patch is restricted into the parent, and the mass
+        mismatch at its coarse-fine interface is refluxed (see _reflux).
+        """
+        if not patches:
+            return
+        covered = np.zeros(parent_new.shape, dtype=bool)
+        for patch in patches:
+            j0, j1, i0, i1 = patch.box
+            covered[j0:j1, i0:i1] = True
+
+        for patch in patches:
+            j0, j1, i0, i1 = patch.box
+            mass_fine_old = np.sum(patch.c)
+            self._advance_patch(patch, parent_old, parent_new, dt_parent)
+
+            r2 = self.ref_ratio**2
+            delta_fine = (np.sum(patch.c) - mass_fine_old) / r2
+            delta_coarse = np.sum(parent_new[j0:j1, i0:i1]) - np.sum(parent_old[j0:j1, i0:i1])
+            self._restrict_into(patch, parent_new)
+            self._reflux(parent_new, patch.box, covered, delta_fine - delta_coarse)
+
+    def _advance_patch(self, patch, parent_old, parent_new, dt_parent):
+        """Subcycle one patch (and its children) over one parent step."""
+        r = self.ref_ratio
+        dt = dt_parent / r
+        ring_old = patch.sample_ring(parent_old)
+        ring_new = patch.sample_ring(parent_new)
+
+        for m in range(r):
+            c_old = patch.c.copy() if patch.children else None
+            a0, a1 = m / r, (m + 1) / r
+            self._step_patch(patch, (1.0 - a0) * ring_old + a0 * ring_new,
+                             (1.0 - a1) * ring_old + a1 * ring_new, dt)
+            self._advance_children(patch.children, c_old, patch.c, dt)
+
+    @staticmethod
+    def _reflux(parent_c, box, covered, excess):
+        """
+        Lumped refluxing of one patch after a parent step.
+
+        excess is the mass (in parent cell units) the fine level gained
+        through the patch boundary beyond what the parent step moved into
+        the box. That is the coarse-fine flux mismatch summed over the
+        boundary; it is taken from (or returned to) the uncovered parent
+        cells next to the box in proportion to their concentration, so the
+        composite mass changes exactly as on the parent level.
+        """
+        j0, j1, i0, i1 = box
+        window = (slice(j0 - 1, j1 + 1), slice(i0 - 1, i1 + 1))
+        neighbours = ~covered[window]
+        c_ring = parent_c[window][neighbours]
+        mass_ring = np.sum(c_ring)
+        if excess == 0.0 or c_ring.size == 0:
+            return
+        if mass_ring > 1e-300:
+            c_ring *= max(0.0, 1.0 - excess / mass_ring)
+        elif excess < 0.0:
+            c_ring += -excess / c_ring.size
+        parent_c[window][neighbours] = c_ring
+
+    def _step_patch(self, patch, ghost_old, ghost_new, dt):
+        """
+        One Crank-Nicolson step on a patch with Dirichlet ghost data.
+
+        (I - θΔtD·L_D) C^(n+1) = C^n + Δt·(-u·∇C^n) + θΔtD·(L C^n + b(g^(n+1)))
+
+        where L C^n uses the ghost values g^n and b(g) is the ghost
+        contribution missing from the homogeneous Dirichlet operator L_D.
+        """
+        padded = patch._padded
+        padded[1:-1, 1:-1] = patch.c
+        padded[patch._ring] = ghost_old
+
+        conv = self._kernel(patch)(patch.u_x, patch.u_y, padded)[1:-1, 1:-1]
+        lap = apply_laplacian(padded, patch.dx, patch.dy)[1:-1, 1:-1]
+
+        # Laplacian of the ghost ring alone = boundary term b(g^(n+1))
+        patch._ghost_new[patch._ring] = ghost_new
+        lap += apply_laplacian(patch._ghost_new, patch.dx, patch.dy)[1:-1, 1:-1]
+
+        rhs = patch.c + dt * conv + dt * (self.D * self.theta) * lap
+        lu = self._factorization(patch).get(dt)
+        patch.c[...] = lu.solve(rhs.ravel()).reshape(patch.ny, patch.nx)
+        np.maximum(patch.c, 0.0, out=patch.c)
+
+    # --------------------------------------------------------
+    # Diagnostics
+    # --------------------------------------------------------
+
+    def get_concentration(self):
+        """Composite level-0 field (covered nodes hold fine-level means)."""
+        return self.base.get_concentration()
+
+    def get_total_mass(self):
+        """Composite mass (equal to the sum over the finest data)."""
+        return self.base.get_total_mass()
+
+    def get_mass_conservation_error(self):
+        return self.base.get_mass_conservation_error()
+
+    def get_spreading_width(self):
+        return self.base.get_spreading_width()
+
+    def get_hierarchy_info(self):
+        """
+        Cell counts of the hierarchy.
+
+        Returns:
+        --------
+        info : dict
+            patches and cells per level, total_cells, uniform_cells (cells
+            of a uniform grid at the finest resolution) and cell_fraction
+        """
+        base_cells = self.base.nx * self.base.ny
+        patches = [len(level_patches) for level_patches in self.levels]
+        cells = [base_cells] + [sum(p.n_cells for p in level_patches)
+                                for level_patches in self.levels]
+        finest = max([0] + [level + 1 for level, n in enumerate(patches) if n])
+        uniform_cells = base_cells * self.ref_ratio**(2 * finest)
+        total_cells = sum(cells)
+        return {
+            'levels': 1 + sum(1 for n in patches if n),
+            'patches_per_level': [1] + patches,
+            'cells_per_level': cells,
+            'total_cells': total_cells,
+            'uniform_cells': uniform_cells,
+            'cell_fraction': total_cells / uniform_cells,
+            'regrids': self.regrid_count
+        }
+
+    def get_solver_info(self):
+        info = self.base.get_solver_info()
+        info['amr'] = self.get_hierarchy_info()
+        return info
+
+    def print_status(self):
+        self.base.print_status()
+        amr = self.get_hierarchy_info()
+        print(f"  AMR: {amr['levels']} levels, patches {amr['patches_per_level']}, "
+              f"cells {amr['cells_per_level']}")
+        print(f"  Cells: {amr['total_cells']} ({100 * amr['cell_fraction']:.1f}% "
+              f"of a uniform finest grid)")
+
+
+if __name__ == "__main__":
+    """
+    Compare AMR against a uniform grid at the finest AMR resolution.
+    """
+    import time
+
+    x_range, y_range = (-3.0, 3.0), (-3.0, 3.0)
+    nx = ny = 61
+    ref_ratio, max_levels = 2, 2
+    D, sigma = 2e-3, 0.15
+    dt, n_steps = 0.02, 50
+
+    def velocity(X, Y):
+        r = np.sqrt(X**2 + Y**2) + 0.5
+        return -Y / r, X / r
+
+    print("\n" + "="*80)
+    print("AMR SOLVER: rotating plume")
+    print("="*80)
+
+    amr = OdorAMRSolverCN(x_range, y_range, nx, ny, D, max_levels=max_levels,
+                          ref_ratio=ref_ratio, cache_operators=False)
+    amr.set_velocity_sampler(velocity)
+    amr.set_initial_condition_gaussian(1.0, 0.0, sigma)
+    u_x, u_y = velocity(amr.base.X, amr.base.Y)
+
+    t0 = time.time()
+    for _ in range(n_steps):
+        amr.step_crank_nicolson(u_x, u_y, dt)
+    t_amr = time.time() - t0
+    amr.print_status()
+
+    nx_fine = (nx - 1) * ref_ratio**(max_levels - 1) + 1
+    uniform = OdorTransportSolverCN(x_range, y_range, nx_fine, nx_fine, D, cache_operators=False)
+    uniform.set_initial_condition_gaussian(1.0, 0.0, sigma)
+    u_x_fine, u_y_fine = velocity(uniform.X, uniform.Y)
+    t0 = time.time()
+    for _ in range(n_steps * ref_ratio**(max_levels - 1)):
+        uniform.step_crank_nicolson(u_x_fine, u_y_fine, dt / ref_ratio**(max_levels - 1))
+    t_uniform = time.time() - t0
+
+    sigma_amr, _ = amr.get_spreading_width()
+    sigma_uniform, _ = uniform.get_spreading_width()
+    print(f"\n[RESULTS]")
+    print(f"  AMR: {t_amr:.2f} s, uniform {nx_fine}×{nx_fine}: {t_uniform:.2f} s")
+    print(f"  Spreading width: AMR {sigma_amr:.4f}, uniform {sigma_uniform:.4f}")
+    print(f"  Mass error: AMR {amr.get_mass_conservation_error():.2e}, "
+          f"uniform {uniform.get_mass_conservation_error():.2e}")
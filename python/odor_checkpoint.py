@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Checkpoint/Restart for Odor Transport Replays
+
+Saves the state of an OdorTransportSolverCN at a fixed step interval,
+like IBAMR's restart_dump_interval, so a long replay can resume after a
+crash instead of starting over:
+
+    directory/odor_checkpoint_<total_steps>.npz
+
+File layout (a NumPy .npz archive, one zip member per entry):
+- c_0000, c_0001, ... : the concentration field in blocks of chunk_rows
+  rows, each compressed on its own
+- meta : JSON with the time, step counters, mass baseline, grid and
+  solver configuration, the Laplacian cache entry and the timesteps that
+  had cached LU factorizations (re-factorized on restore), plus the
+  caller's extra fields (e.g. the IBAMR frame index)
+
+Writes are atomic: the archive is written to a temporary file in the same
+directory and renamed into place, so a crash during a write leaves the
+previous checkpoint intact. CheckpointManager copies the state in the
+calling thread and compresses/writes it in a background thread, so the
+solver only pays for one field copy per checkpoint.
+"""
+
+import json
+import os
+import threading
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+CHECKPOINT_VERSION = 1
+CHECKPOINT_PREFIX = 'odor_checkpoint_'
+
+
+def checkpoint_path(directory, step):
+    """Checkpoint file for a given step count."""
+    return Path(directory) / f"{CHECKPOINT_PREFIX}{step:010d}.npz"
+
+
+def list_checkpoints(directory):
+    """
+    Complete checkpoints in a directory, oldest first.
+
+    Returns:
+    --------
+    paths : list of Path
+        Sorted by step count; temporary files of unfinished writes are
+        ignored
+    """
+    directory = Path(directory)
+    if not directory.is_dir():
+        return []
+    paths = []
+    for path in directory.glob(f"{CHECKPOINT_PREFIX}*.npz"):
+        step = path.stem[len(CHECKPOINT_PREFIX):]
+        if step.isdigit():
+            paths.append((int(step), path))
+    return [path for _, path in sorted(paths)]
+
+
+def find_latest_checkpoint(directory):
+    """Most recent checkpoint in a directory, or None."""
+    paths = list_checkpoints(directory)
+    return paths[-1] if paths else None
+
+
+def write_checkpoint(path, state, chunk_rows=256):
+    """
+    Write a solver state atomically.
+
+    Parameters:
+    -----------
+    path : str or Path
+        Destination file
+    state : dict
+        {'c': ndarray (ny, nx), 'meta': dict} as returned by
+        OdorTransportSolverCN.get_checkpoint_state()
+    chunk_rows : int
+        Rows of c per compressed chunk
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    c = state['c']
+    meta = dict(state['meta'], version=CHECKPOINT_VERSION, chunk_rows=chunk_rows)
+    arrays = {f"c_{k:04d}": c[start:start + chunk_rows]
+              for k, start in enumerate(range(0, c.shape[0], chunk_rows))}
+    arrays['meta'] = np.array(json.dumps(meta))
+
+    tmp_file = path.with_name(f"{path.stem}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(tmp_file, 'wb') as f:
+            np.savez_compressed(f, **arrays)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, path)
+    finally:
+        if tmp_file.exists():
+            tmp_file.unlink()
+
+
+def read_checkpoint(path):
+    """
+    Read a checkpoint written by write_checkpoint.
+
+    Returns:
+    --------
+    state : dict
+        {'c': ndarray (ny, nx), 'meta': dict}
+    """
+    with np.load(path, allow_pickle=False) as archive:
+        meta = json.loads(str(archive['meta']))
+        if meta.get('version') != CHECKPOINT_VERSION:
+            raise ValueError(f"{path}: unsupported checkpoint version {meta.get('version')}")
+        chunks = sorted(name for name in archive.files if name.startswith('c_'))
+        c = np.concatenate([archive[name] for name in chunks], axis=0)
+    return {'c': c, 'meta': meta}
+
+
+class CheckpointManager:
+    """
+    Periodic, asynchronous checkpoints of one solver.
+
+    Usage:
+
+        checkpoints = CheckpointManager('odor_restart', interval=150)
+        meta = checkpoints.resume(solver)          # None on a fresh start
+        # or, for a fresh run: checkpoints.clear()
+        for frame in frames:
+            solver.advance(u_x, u_y, t_frame, dt)
+            checkpoints.maybe_save(solver, frame=frame)
+        checkpoints.close()
+    """
+
+    def __init__(self, directory, interval=150, keep=2, asynchronous=True, chunk_rows=256):
+        """
+        Parameters:
+        -----------
+        directory : str or Path
+            Checkpoint directory
+        interval : int
+            Minimum number of solver steps between checkpoints
+            (input2d: restart_dump_interval = 150)
+        keep : int
+            Number of most recent checkpoints kept on disk
+        asynchronous : bool
+            Compress and write in a background thread
+        chunk_rows : int
+            Rows of c per compressed chunk
+        """
+        if interval < 1:
+            raise ValueError(f"interval must be >= 1, got {interval}")
+        if keep < 1:
+            raise ValueError(f"keep must be >= 1, got {keep}")
+        self.directory = Path(directory)
+        self.interval = interval
+        self.keep = keep
+        self.chunk_rows = chunk_rows
+        self._executor = ThreadPoolExecutor(max_workers=1) if asynchronous else None
+        self._pending = None
+        self._last_step = None
+        self.n_written = 0
+
+    def maybe_save(self, solver, force=False, **extra):
+        """
+        Save if interval steps have passed since the last checkpoint.
+
+        Call at points the run can resume from, e.g. after each frame;
+        extra keyword arguments (frame=...) are stored in the metadata.
+
+        Returns:
+        --------
+        path : Path or None
+            Checkpoint file being written
+        """
+        if self._last_step is None:
+            self._last_step = solver.total_steps
+        if not force and solver.total_steps - self._last_step < self.interval:
+            return None
+        return self.save(solver, **extra)
+
+    def save(self, solver, **extra):
+        """
+        Checkpoint the solver now.
+
+        The state is copied before returning; compression and the atomic
+        write happen in the background (at most one write in flight).
+
+        Returns:
+        --------
+        path : Path
+        """
+        state = solver.get_checkpoint_state()
+        state['meta'].update(extra)
+        path = checkpoint_path(self.directory, solver.total_steps)
+        self._last_step = solver.total_steps
+
+        self.wait()
+        if self._executor is None:
+            self._write(path, state)
+        else:
+            self._pending = self._executor.submit(self._write, path, state)
+        return path
+
+    def _write(self, path, state):
+        write_checkpoint(path, state, self.chunk_rows)
+        self.n_written += 1
+        for old in list_checkpoints(self.directory)[:-self.keep]:
+            try:
+                old.unlink()
+            except OSError as e:
+                warnings.warn(f"Could not remove old checkpoint {old}: {e}")
+
+    def wait(self):
+        """Block until the pending write has finished (re-raises its error)."""
+        if self._pending is not None:
+            pending, self._pending = self._pending, None
+            pending.result()
+
+    def latest(self):
+        """Most recent complete checkpoint, or None."""
+        self.wait()
+        return find_latest_checkpoint(self.directory)
+
+    def clear(self):
+        """
+        Remove every checkpoint in the directory (before a fresh run, so a
+        later resume cannot pick up checkpoints of an earlier run).
+
+        Returns:
+        --------
+        n_removed : int
+        """
+        self.wait()
+        paths = list_checkpoints(self.directory)
+        for path in paths:
+            path.unlink()
+        self._last_step = None
+        return len(paths)
+
+    def resume(self, solver, warm_operators=True):
+        """
+        Restore the solver from the latest checkpoint, if there is one.
+
+        Returns:
+        --------
+        meta : dict or None
+            Checkpoint metadata (including extra fields such as frame),
+            or None if the directory holds no checkpoint
+        """
+        path = self.latest()
+        if path is None:
+            return None
+        state = read_checkpoint(path)
+        solver.restore_checkpoint_state(state, warm_operators=warm_operators)
+        self._last_step = solver.total_steps
+        print(f"[CHECKPOINT] Resumed from {path} (t = {solver.t:.6f}, "
+              f"step {solver.total_steps})")
+        return state['meta']
+
+    def close(self):
+        """Finish the pending write and stop the writer thread."""
+        self.wait()
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
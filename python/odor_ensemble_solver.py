@@ -0,0 +1,630 @@
+#!/usr/bin/env python3
+"""
+Batched Ensemble Solver for Odor Transport
+
+Advances several odor fields that share one grid and one velocity field
+but differ in diffusivity (e.g. a sweep over Schmidt numbers Sc = ν/D):
+
+    ∂C_k/∂t + u·∇C_k = D_k ∇²C_k,      k = 1 … n_members
+
+The concentrations are stored as one stacked array of shape
+(n_members, ny, nx) and advanced together:
+
+- Convection: the upwind selection depends only on the velocity, so the
+  masks are built once per step and applied to all members in one
+  vectorized pass (UpwindConvectionKernel with n_batch).
+- Diffusion: with solver_backend='spectral' (the default when the
+  members have several distinct D) all members share one set of
+  eigenvalues, are transformed in a single batched FFT/DCT call and are
+  divided by their cached per-member symbols in place. With 'direct' the
+  Laplacian is assembled once and members with equal D share one LU
+  factorization per Δt, solved as a multi-right-hand-side system; every
+  distinct D still needs its own factorization and triangular solves.
+
+The work per member (convection, stencil, transforms or triangular
+solves) does not go away, so the cost grows linearly with the number of
+members. On the 200×150 grid, a step of 20 distinct Schmidt numbers
+costs 14-18 steps of a single spectral solver (about 30% less than 20
+independent spectral solvers, or about four steps of a single 'direct'
+solver). With 'direct' it costs 20-40 single steps, no less than
+independent direct solvers, whose factors also compete for cache.
+Members that share D are where the ensemble saves most (see
+OdorMultiSpeciesSolverCN).
+
+Each member follows exactly the same Crank-Nicolson discretization as
+OdorTransportSolverCN, so a member reproduces the corresponding single
+solver run.
+
+OdorMultiSpeciesSolverCN uses the same machinery for tagged scalars, e.g.
+one odor species per fish or per upstream release point: species are
+named, can share or differ in diffusivity, and are released individually
+(set_species_gaussian / set_species_field).
+"""
+
+import numpy as np
+
+from odor_transport_solver_CN import (
+    BOUNDARY_TYPES,
+    FactorizationCache,
+    SpectralDiffusionSolver,
+    UpwindConvectionKernel,
+    LaplacianStencil,
+    default_operator_cache_dir,
+    load_or_build_laplacian,
+)
+
+ENSEMBLE_SOLVER_BACKENDS = ('direct', 'spectral')
+
+
+class OdorEnsembleSolverCN:
+    """
+    Crank-Nicolson odor transport for a stack of members with per-member D.
+
+    The convection masks, the operator setup and (with 'spectral') the
+    transform calls are shared; the per-member work is not, so a sweep
+    over n Schmidt numbers costs about 0.9·n single-solver steps per step.
+    """
+
+    def __init__(self, x_range, y_range, nx, ny, diffusion_coeffs,
+                 boundary_type='neumann', schmidt_numbers=None,
+                 cache_operators=True, operator_cache_dir=None,
+                 factorization_cache_mb=512.0, convection_backend='numpy',
+                 solver_backend='auto'):
+        """
+        Initialize the ensemble solver.
+
+        Parameters:
+        -----------
+        x_range : tuple
+            (x_min, x_max) domain bounds in x-direction
+        y_range : tuple
+            (y_min, y_max) domain bounds in y-direction
+        nx, ny : int
+            Number of grid points in x and y directions
+        diffusion_coeffs : sequence of float
+            Diffusion coefficient D_k of each member
+        boundary_type : str
+            'neumann' (default), 'dirichlet' or 'periodic'
+        schmidt_numbers : sequence of float, optional
+            Schmidt number of each member, for reference
+        cache_operators : bool
+            Reuse the Laplacian from the on-disk operator cache
+        operator_cache_dir : str or Path, optional
+            Cache location (default: default_operator_cache_dir())
+        factorization_cache_mb : float
+            Memory budget for the cached LU factorizations of all distinct
+            D together (split evenly between them)
+        convection_backend : str
+            'numpy' (default), 'numba' or 'python'
+        solver_backend : str
+            'direct' (sparse LU), 'spectral' (FFT/DCT/DST) or 'auto'
+            (default: 'spectral' if the members have more than one
+            distinct D, else 'direct')
+        """
+        if boundary_type not in BOUNDARY_TYPES:
+            raise ValueError(f"Unknown boundary_type '{boundary_type}', expected one of {BOUNDARY_TYPES}")
+        if solver_backend not in ENSEMBLE_SOLVER_BACKENDS + ('auto',):
+            raise ValueError(f"Unknown solver_backend '{solver_backend}', "
+                             f"expected one of {ENSEMBLE_SOLVER_BACKENDS + ('auto',)}")
+
+        self.D = np.asarray(diffusion_coeffs, dtype=float).ravel()
+        self.n_members = len(self.D)
+        if self.n_members == 0:
+            raise ValueError("Ensemble needs at least one member")
+        if schmidt_numbers is not None and len(schmidt_numbers) != self.n_members:
+            raise ValueError(f"Got {len(schmidt_numbers)} Schmidt numbers for {self.n_members} members")
+
+        self.x_min, self.x_max = x_range
+        self.y_min, self.y_max = y_range
+        self.nx = nx
+        self.ny = ny
+        self.boundary_type = boundary_type
+        self.schmidt_numbers = None if schmidt_numbers is None else list(schmidt_numbers)
+        self.theta = 0.5
+
+        # Members with identical D share one operator
+        unique_D, inverse = np.unique(self.D, return_inverse=True)
+        self.groups = [(D, np.flatnonzero(inverse == g)) for g, D in enumerate(unique_D)]
+
+        # A sweep over D would need one factorization per member; the
+        # spectral solve shares one batched transform instead
+        if solver_backend == 'auto':
+            solver_backend = 'spectral' if len(self.groups) > 1 else 'direct'
+        self.solver_backend = solver_backend
+
+        # Create regular Cartesian grid (same as OdorTransportSolverCN)
+        self.x = np.linspace(self.x_min, self.x_max, nx)
+        self.y = np.linspace(self.y_min, self.y_max, ny)
+        self.X, self.Y = np.meshgrid(self.x, self.y)
+
+        self.dx = self.x[1] - self.x[0]
+        self.dy = self.y[1] - self.y[0]
+
+        # Stacked concentration fields
+        self.c = np.zeros((self.n_members, ny, nx))
+        self.t = 0.0
+
+        self.total_steps = 0
+        self.mass_initial = np.zeros(self.n_members)
+
+        self._convection_kernel = UpwindConvectionKernel(ny, nx, self.dx, self.dy,
+                                                         convection_backend,
+                                                         n_batch=self.n_members)
+        self._conv_term = np.zeros_like(self.c)
+        self._rhs = np.zeros_like(self.c)
+        self._c_next = np.zeros_like(self.c)
+
+        # Same matrix-free Laplacian as the single solver, member by member
+        self._laplacian_stencil = LaplacianStencil(ny, nx, self.dx, self.dy, boundary_type)
+        self._lap = np.zeros_like(self.c)
+
+        self.L = None
+        self.factorization_caches = {}
+        self._spectral = None
+
+        if solver_backend == 'spectral':
+            self._spectral = SpectralDiffusionSolver(nx, ny, self.dx, self.dy, boundary_type)
+        else:
+            cache_dir = None
+            if cache_operators:
+                cache_dir = operator_cache_dir if operator_cache_dir is not None \
+                    else default_operator_cache_dir()
+            self.L = load_or_build_laplacian(nx, ny, self.dx, self.dy, boundary_type, cache_dir)
+            # One budget for all groups (each cache keeps its latest factor)
+            budget_mb = factorization_cache_mb / len(self.groups)
+            for D, _ in self.groups:
+                self.factorization_caches[D] = FactorizationCache(self.L, D * self.theta,
+                                                                  budget_mb)
+
+        print(f"[ENSEMBLE-CN] Crank-Nicolson Ensemble Solver Initialized")
+        print(f"  Grid: {nx} × {ny} points, {self.n_members} members "
+              f"({len(self.groups)} distinct diffusivities)")
+        print(f"  Diffusion coefficients: D ∈ [{self.D.min():.3e}, {self.D.max():.3e}]")
+        print(f"  Boundary conditions: {boundary_type}")
+        print(f"  Implicit solver: {self.solver_backend}")
+
+    # --------------------------------------------------------
+    # Initial conditions
+    # --------------------------------------------------------
+
+    def set_initial_condition_gaussian(self, x0, y0, sigma, amplitude=1.0):
+        """
+        Set the same Gaussian initial condition for every member.
+
+        C_k(x,y,0) = A * exp(-((x-x0)² + (y-y0)²) / (2σ²))
+        """
+        r_squared = (self.X - x0)**2 + (self.Y - y0)**2
+        self.c[...] = amplitude * np.exp(-r_squared / (2 * sigma**2))
+        self.t = 0.0
+        self.total_steps = 0
+        self.mass_initial = self.get_total_mass()
+
+        print(f"[ENSEMBLE-CN] Initial condition set: Gaussian at ({x0}, {y0}), σ = {sigma:.3f}")
+
+    def set_initial_condition_custom(self, concentration_field):
+        """
+        Set custom initial condition.
+
+        Parameters:
+        -----------
+        concentration_field : ndarray (ny, nx) or (n_members, ny, nx)
+            A single field is copied to every member
+        """
+        concentration_field = np.asarray(concentration_field)
+        if concentration_field.shape not in ((self.ny, self.nx), self.c.shape):
+            raise ValueError(f"Shape mismatch: expected {(self.ny, self.nx)} or {self.c.shape}, "
+                             f"got {concentration_field.shape}")
+
+        self.c[...] = concentration_field
+        self.t = 0.0
+        self.total_steps = 0
+        self.mass_initial = self.get_total_mass()
+
+    # --------------------------------------------------------
+    # Time stepping
+    # --------------------------------------------------------
+
+    def compute_stable_timestep(self, u_x, u_y, cfl_max=0.5):
+        """
+        Maximum stable timestep from the advective CFL condition.
+
+        All members share the velocity, so the limit is the same as for a
+        single OdorTransportSolverCN.
+        """
+        u_max = np.max(np.abs(u_x)) + 1e-10
+        v_max = np.max(np.abs(u_y)) + 1e-10
+        return cfl_max * min(self.dx / u_max, self.dy / v_max)
+
+    def step_crank_nicolson(self, u_x, u_y, dt):
+        """
+        Advance all members one timestep.
+
+        (I - (Δt·D_k/2)·L) C_k^(n+1) = C_k^n + Δt·(-u·∇C_k^n + (D_k/2)·L·C_k^n)
+
+        Parameters:
+        -----------
+        u_x, u_y : ndarray (ny, nx)
+            Shared velocity field at current time
+        dt : float
+            Timestep size
+        """
+        m, N = self.n_members, self.nx * self.ny
+
+        # Shared upwind masks, applied to the whole stack
+        conv_term = self._convection_kernel(u_x, u_y, self.c, out=self._conv_term)
+
+        # RHS in the persistent buffers, same operation order as the
+        # single solver: C + Δt·conv + Δt·(D_k·θ)·L·C
+        lap = self._lap
+        for k in range(m):
+            self._laplacian_stencil(self.c[k], lap[k])
+        np.multiply(lap, (self.D * self.theta)[:, None, None], out=lap)
+        np.multiply(lap, dt, out=lap)
+        np.multiply(conv_term, dt, out=conv_term)
+        rhs = np.add(self.c, conv_term, out=self._rhs)
+        np.add(rhs, lap, out=rhs)
+
+        if self.solver_backend == 'spectral':
+            # One shared symbol when every member has the same D
+            if len(self.groups) == 1:
+                alpha = dt * self.groups[0][0] * self.theta
+            else:
+                alpha = dt * self.D * self.theta
+            c_new = self._spectral.solve(rhs, alpha, overwrite_rhs=True)
+            self._rhs, self.c = self.c, c_new
+        else:
+            rhs_flat = rhs.reshape(m, N)
+            c_next = self._c_next.reshape(m, N)
+            for D, members in self.groups:
+                lu = self.factorization_caches[D].get(dt)
+                # Multi-right-hand-side solve: one column per member
+                c_next[members] = lu.solve(np.ascontiguousarray(rhs_flat[members].T)).T
+            self._c_next, self.c = self.c, self._c_next
+
+        self._apply_boundary_conditions()
+        np.maximum(self.c, 0.0, out=self.c)
+
+        self.t += dt
+        self.total_steps += 1
+
+    def step_diffusion_only(self, dt):
+        """Advance all members with pure diffusion (zero velocity)."""
+        zero = np.zeros((self.ny, self.nx))
+        self.step_crank_nicolson(zero, zero, dt)
+
+    def _apply_boundary_conditions(self):
+        if self.boundary_type == 'dirichlet':
+            self.c[:, 0, :] = 0.0
+            self.c[:, -1, :] = 0.0
+            self.c[:, :, 0] = 0.0
+            self.c[:, :, -1] = 0.0
+
+    # --------------------------------------------------------
+    # Diagnostics
+    # --------------------------------------------------------
+
+    def get_concentration(self, member=None):
+        """
+        Copy of the concentration field(s).
+
+        Parameters:
+        -----------
+        member : int, optional
+            Member index; the full stack is returned if omitted
+        """
+        if member is None:
+            return self.c.copy()
+        return self.c[member].copy()
+
+    def get_total_mass(self):
+        """Total mass of every member, ndarray (n_members,)."""
+        return np.sum(self.c, axis=(1, 2)) * self.dx * self.dy
+
+    def get_mass_conservation_error(self):
+        """Relative mass error of every member, ndarray (n_members,)."""
+        mass_current = self.get_total_mass()
+        error = np.abs(mass_current - self.mass_initial)
+        scale = np.where(self.mass_initial > 1e-10, self.mass_initial, 1.0)
+        return error / scale
+
+    def get_spreading_width(self):
+        """
+        Spreading width and centroid of every member.
+
+        Returns:
+        --------
+        sigma : ndarray (n_members,)
+        centroid : tuple of ndarray (x_c, y_c)
+        """
+        total_mass = np.sum(self.c, axis=(1, 2)) + 1e-10
+
+        x_c = np.sum(self.c * self.X, axis=(1, 2)) / total_mass
+        y_c = np.sum(self.c * self.Y, axis=(1, 2)) / total_mass
+
+        var_x = np.sum(self.c * (self.X - x_c[:, None, None])**2, axis=(1, 2)) / total_mass
+        var_y = np.sum(self.c * (self.Y - y_c[:, None, None])**2, axis=(1, 2)) / total_mass
+
+        return np.sqrt(var_x + var_y), (x_c, y_c)
+
+    def get_member_info(self, member):
+        """
+        Statistics of one member, with the same keys as
+        OdorTransportSolverCN.get_solver_info().
+        """
+        c = self.c[member]
+        total_mass = np.sum(c) + 1e-10
+        x_c = np.sum(c * self.X) / total_mass
+        y_c = np.sum(c * self.Y) / total_mass
+        sigma = np.sqrt(np.sum(c * (self.X - x_c)**2) / total_mass +
+                        np.sum(c * (self.Y - y_c)**2) / total_mass)
+        j_max, i_max = np.unravel_index(np.argmax(c), c.shape)
+
+        return {
+            'time': self.t,
+            'total_steps': self.total_steps,
+            'total_mass': np.sum(c) * self.dx * self.dy,
+            'mass_conservation_error': self.get_mass_conservation_error()[member],
+            'spreading_width': sigma,
+            'centroid': (x_c, y_c),
+            'max_concentration': c[j_max, i_max],
+            'max_location': (self.x[i_max], self.y[j_max]),
+            'grid_size': (self.nx, self.ny),
+            'resolution': (self.dx, self.dy),
+            'diffusion_coeff': self.D[member],
+            'schmidt_number': None if self.schmidt_numbers is None else self.schmidt_numbers[member],
+            'solver_backend': self.solver_backend
+        }
+
+    def get_solver_info(self):
+        """
+        Ensemble statistics (per-member values as arrays).
+        """
+        sigma, (x_c, y_c) = self.get_spreading_width()
+
+        info = {
+            'time': self.t,
+            'total_steps': self.total_steps,
+            'n_members': self.n_members,
+            'n_operators': len(self.groups),
+            'total_mass': self.get_total_mass(),
+            'mass_conservation_error': self.get_mass_conservation_error(),
+            'spreading_width': sigma,
+            'centroid': (x_c, y_c),
+            'max_concentration': self.c.max(axis=(1, 2)),
+            'diffusion_coeff': self.D.copy(),
+            'schmidt_number': self.schmidt_numbers,
+            'grid_size': (self.nx, self.ny),
+            'resolution': (self.dx, self.dy),
+            'solver_backend': self.solver_backend
+        }
+
+        if self.factorization_caches:
+            info['factorization_cache_hits'] = sum(fc.hits for fc in self.factorization_caches.values())
+            info['factorization_cache_misses'] = sum(fc.misses for fc in self.factorization_caches.values())
+
+        return info
+
+    def print_status(self):
+        """Print current ensemble status, one line per member."""
+        info = self.get_solver_info()
+
+        print(f"\n[ENSEMBLE STATUS] t = {info['time']:.4f}, steps = {info['total_steps']}")
+        for k in range(self.n_members):
+            label = self._member_label(k)
+            print(f"  {label:>12s}: D = {self.D[k]:.3e}, σ = {info['spreading_width'][k]:.4f}, "
+                  f"mass error = {info['mass_conservation_error'][k]:.2e}")
+
+    def _member_label(self, k):
+        return f"Sc = {self.schmidt_numbers[k]:g}" if self.schmidt_numbers else f"member {k}"
+
+
+class OdorMultiSpeciesSolverCN(OdorEnsembleSolverCN):
+    """
+    Several tagged odor species (e.g. one per fish or per release point)
+    transported by one flow.
+
+    A thin layer over OdorEnsembleSolverCN: the concentrations are the
+    (n_species, ny, nx) stack self.c, species with equal diffusivity share
+    one Laplacian and one factorization per Δt (solved as a multi-RHS
+    system), and convection is a single batched pass. What it adds is
+    species naming and per-species initial conditions, so that each
+    scalar can be released at its own source.
+    """
+
+    def __init__(self, x_range, y_range, nx, ny, species, diffusion_coeff,
+                 boundary_type='neumann', schmidt_number=None,
+                 cache_operators=True, operator_cache_dir=None,
+                 factorization_cache_mb=512.0, convection_backend='numpy',
+                 solver_backend='auto'):
+        """
+        Initialize the multi-species solver.
+
+        Parameters:
+        -----------
+        x_range, y_range : tuple
+            Domain bounds
+        nx, ny : int
+            Number of grid points in x and y directions
+        species : int or sequence of str
+            Number of species (named 'species_0', …) or their names
+        diffusion_coeff : float or sequence of float
+            One D for all species, or one per species
+        schmidt_number : float or sequence of float, optional
+            Schmidt number(s), for reference
+        Other parameters as for OdorEnsembleSolverCN.
+        """
+        if isinstance(species, (int, np.integer)):
+            names = [f"species_{k}" for k in range(species)]
+        else:
+            names = [str(name) for name in species]
+        if len(set(names)) != len(names):
+            raise ValueError(f"Species names must be unique, got {names}")
+        n_species = len(names)
+
+        diffusion_coeffs = np.broadcast_to(np.asarray(diffusion_coeff, dtype=float),
+                                           (n_species,))
+        schmidt_numbers = None
+        if schmidt_number is not None:
+            schmidt_numbers = list(np.broadcast_to(np.asarray(schmidt_number, dtype=float),
+                                                   (n_species,)))
+
+        self.species = names
+        super().__init__(x_range, y_range, nx, ny, diffusion_coeffs,
+                         boundary_type=boundary_type, schmidt_numbers=schmidt_numbers,
+                         cache_operators=cache_operators, operator_cache_dir=operator_cache_dir,
+                         factorization_cache_mb=factorization_cache_mb,
+                         convection_backend=convection_backend, solver_backend=solver_backend)
+        self.n_species = self.n_members
+
+    def species_index(self, species):
+        """Stack index of a species given by name or index."""
+        if isinstance(species, (int, np.integer)):
+            if not -self.n_species <= species < self.n_species:
+                raise IndexError(f"Species index {species} out of range for {self.n_species} species")
+            return int(species) % self.n_species
+        try:
+            return self.species.index(species)
+        except ValueError:
+            raise KeyError(f"Unknown species '{species}', expected one of {self.species}") from None
+
+    def set_species_gaussian(self, species, x0, y0, sigma, amplitude=1.0):
+        """
+        Gaussian release of one species; the other species are untouched.
+
+        Parameters:
+        -----------
+        species : str or int
+            Species name or index
+        x0, y0 : float
+            Release location
+        sigma : float
+            Gaussian width
+        amplitude : float
+            Peak concentration
+        """
+        k = self.species_index(species)
+        r_squared = (self.X - x0)**2 + (self.Y - y0)**2
+        self.c[k] = amplitude * np.exp(-r_squared / (2 * sigma**2))
+        self.mass_initial[k] = np.sum(self.c[k]) * self.dx * self.dy
+
+        print(f"[ENSEMBLE-CN] Species '{self.species[k]}': Gaussian at ({x0}, {y0}), σ = {sigma:.3f}")
+
+    def set_species_field(self, species, concentration_field):
+        """
+        Set the concentration of one species; the other species are untouched.
+
+        Parameters:
+        -----------
+        species : str or int
+            Species name or index
+        concentration_field : ndarray (ny, nx)
+        """
+        k = self.species_index(species)
+        concentration_field = np.asarray(concentration_field)
+        if concentration_field.shape != (self.ny, self.nx):
+            raise ValueError(f"Shape mismatch: expected {(self.ny, self.nx)}, "
+                             f"got {concentration_field.shape}")
+        self.c[k] = concentration_field
+        self.mass_initial[k] = np.sum(self.c[k]) * self.dx * self.dy
+
+    def get_species(self, species):
+        """Copy of one species' concentration field (ny, nx)."""
+        return self.get_concentration(self.species_index(species))
+
+    def get_species_info(self, species):
+        """Statistics of one species (see get_member_info)."""
+        k = self.species_index(species)
+        info = self.get_member_info(k)
+        info['species'] = self.species[k]
+        return info
+
+    def get_solver_info(self):
+        """Multi-species statistics (per-species values as arrays)."""
+        info = super().get_solver_info()
+        info['species'] = list(self.species)
+        return info
+
+    def _member_label(self, k):
+        return self.species[k]
+
+
+if __name__ == "__main__":
+    """
+    Compare an ensemble sweep against independent single-member solvers.
+    """
+    import time
+    from odor_transport_solver_CN import OdorTransportSolverCN
+
+    nu = 0.785 / 5609.0
+    schmidt_numbers = list(np.geomspace(1.0, 1000.0, 20))
+    diffusion_coeffs = [nu / Sc for Sc in schmidt_numbers]
+
+    nx, ny = 200, 150
+    x_range, y_range = (-6.0, 3.0), (-3.0, 3.0)
+    dt, n_steps = 0.001, 100
+
+    x = np.linspace(*x_range, nx)
+    y = np.linspace(*y_range, ny)
+    X, Y = np.meshgrid(x, y)
+    r = np.sqrt(X**2 + Y**2) + 0.1
+    u_x, u_y = -2.0 * Y / r**2, 2.0 * X / r**2
+
+    print("\n" + "="*80)
+    print("ENSEMBLE SOLVER: Schmidt number sweep")
+    print("="*80)
+
+    ensemble = OdorEnsembleSolverCN(x_range, y_range, nx, ny, diffusion_coeffs,
+                                    schmidt_numbers=schmidt_numbers)
+    ensemble.set_initial_condition_gaussian(-2.0, 0.0, 0.2)
+
+    t0 = time.time()
+    for _ in range(n_steps):
+        ensemble.step_crank_nicolson(u_x, u_y, dt)
+    t_ensemble = time.time() - t0
+    ensemble.print_status()
+
+    t_single = 0.0
+    max_diff = 0.0
+    for k, D in enumerate(diffusion_coeffs):
+        solver = OdorTransportSolverCN(x_range, y_range, nx, ny, D,
+                                       solver_backend=ensemble.solver_backend)
+        solver.set_initial_condition_gaussian(-2.0, 0.0, 0.2)
+        t0 = time.time()
+        for _ in range(n_steps):
+            solver.step_crank_nicolson(u_x, u_y, dt)
+        t_single += time.time() - t0
+        max_diff = max(max_diff, np.max(np.abs(solver.c - ensemble.c[k])))
+
+    print(f"\n[RESULTS]")
+    print(f"  Ensemble: {t_ensemble:.3f} s, independent solvers: {t_single:.3f} s")
+    print(f"  Ensemble step: {t_ensemble / t_single * len(diffusion_coeffs):.1f} "
+          f"single-solver steps for {len(diffusion_coeffs)} members")
+    print(f"  Max difference to independent solvers: {max_diff:.2e}")
+
+    print("\n" + "="*80)
+    print("MULTI-SPECIES SOLVER: 8 tagged releases, one diffusivity")
+    print("="*80)
+
+    names = [f"fish_{k}" for k in range(8)]
+    species = OdorMultiSpeciesSolverCN(x_range, y_range, nx, ny, names, diffusion_coeffs[0])
+    for k, name in enumerate(names):
+        species.set_species_gaussian(name, -5.0 + k, 0.0, 0.2)
+
+    t0 = time.time()
+    for _ in range(n_steps):
+        species.step_crank_nicolson(u_x, u_y, dt)
+    t_species = time.time() - t0
+    species.print_status()
+
+    # One independent solver, timed and scaled to 8 species
+    solver = OdorTransportSolverCN(x_range, y_range, nx, ny, diffusion_coeffs[0])
+    solver.set_initial_condition_gaussian(-5.0, 0.0, 0.2)
+    t0 = time.time()
+    for _ in range(n_steps):
+        solver.step_crank_nicolson(u_x, u_y, dt)
+    t_single = time.time() - t0
+    max_diff = np.max(np.abs(solver.c - species.get_species('fish_0')))
+
+    print(f"\n[RESULTS]")
+    print(f"  8 species: {t_species:.3f} s, 8 independent solvers ≈ {8 * t_single:.3f} s")
+    print(f"  Max difference to an independent solver: {max_diff:.2e}")
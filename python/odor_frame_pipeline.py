@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Background Prefetching of IBAMR Frames
+
+The replay drivers alternate between loading a frame (reading the VTK
+pieces or the frame store and resampling the velocity onto the solver
+grid) and advancing the solver to the frame time. Run serially, each
+frame costs load + solve. FramePrefetcher loads the next frames in a
+background thread while the caller works on the current one, so a frame
+costs about max(load, solve):
+
+    frames = FramePrefetcher(load_frame, frame_indices, depth=2)
+    for frame_idx, (u_x, u_y, eels) in frames:
+        solver.advance(u_x, u_y, t_frame, dt)
+    frames.close()
+
+Frames are delivered in the order of frame_indices. At most depth frames
+are loaded ahead of the one being processed (the bounded queue), which
+also bounds the memory held by loaded frames. An exception in
+load_frame is re-raised when its frame is reached.
+
+Threads rather than processes: the loaders spend their time in file I/O,
+memory-mapped reads and NumPy/SciPy kernels, which release the GIL, and
+they share the resampler caches (triangulations and weights), which a
+process pool would have to rebuild in every worker. Loaders used with
+workers > 1 must be safe to call concurrently.
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+class FramePrefetcher:
+    """
+    Ordered, bounded read-ahead over a sequence of frames.
+
+    Iterating yields (frame_idx, load_frame(frame_idx)) pairs.
+    """
+
+    def __init__(self, load_frame, frame_indices, depth=2, workers=1):
+        """
+        Parameters:
+        -----------
+        load_frame : callable
+            frame_idx -> frame data (e.g. the velocity on the solver grid)
+        frame_indices : iterable of int
+            Frames in delivery order
+        depth : int
+            Frames loaded ahead of the one being processed
+            (0 = load in the calling thread, no background work)
+        workers : int
+            Loader threads (frames are still delivered in order)
+        """
+        if depth < 0:
+            raise ValueError(f"depth must be >= 0, got {depth}")
+        if workers < 1:
+            raise ValueError(f"workers must be >= 1, got {workers}")
+        self.load_frame = load_frame
+        self.frame_indices = list(frame_indices)
+        self.depth = depth
+        self._executor = (ThreadPoolExecutor(max_workers=workers,
+                                             thread_name_prefix='frame-prefetch')
+                          if depth > 0 else None)
+        self._pending = deque()
+        self._next = 0
+        self._lock = threading.Lock()
+
+        # Diagnostics: time spent loading vs. time the caller waited
+        self.load_time = 0.0
+        self.wait_time = 0.0
+        self.n_delivered = 0
+
+    def _timed_load(self, frame_idx):
+        start = time.perf_counter()
+        try:
+            return self.load_frame(frame_idx)
+        finally:
+            with self._lock:
+                self.load_time += time.perf_counter() - start
+
+    def _fill(self):
+        """Submit loads until depth frames are queued."""
+        while len(self._pending) < self.depth and self._next < len(self.frame_indices):
+            frame_idx = self.frame_indices[self._next]
+            self._next += 1
+            self._pending.append((frame_idx, self._executor.submit(self._timed_load, frame_idx)))
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        start = time.perf_counter()
+        if self._executor is None:
+            if self._next >= len(self.frame_indices):
+                raise StopIteration
+            frame_idx = self.frame_indices[self._next]
+            self._next += 1
+            data = self._timed_load(frame_idx)
+        else:
+            self._fill()
+            if not self._pending:
+                raise StopIteration
+            frame_idx, future = self._pending.popleft()
+            # Keep depth frames loading while this one is waited for and processed
+            self._fill()
+            data = future.result()
+        self.wait_time += time.perf_counter() - start
+        self.n_delivered += 1
+        return frame_idx, data
+
+    def get_info(self):
+        """
+        Returns:
+        --------
+        info : dict
+            frames delivered, total load time, time the caller waited and
+            the fraction of the load time hidden behind the caller's work
+        """
+        hidden = 1.0 - self.wait_time / self.load_time if self.load_time > 0 else 0.0
+        return {
+            'frames': self.n_delivered,
+            'depth': self.depth,
+            'load_time': self.load_time,
+            'wait_time': self.wait_time,
+            'hidden_fraction': max(hidden, 0.0),
+        }
+
+    def close(self):
+        """Cancel the queued loads and stop the loader threads."""
+        self._next = len(self.frame_indices)
+        while self._pending:
+            self._pending.popleft()[1].cancel()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
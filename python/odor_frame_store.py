@@ -0,0 +1,635 @@
+#!/usr/bin/env python3
+"""
+Consolidated Frame Store for IBAMR Runs
+
+The analysis scripts re-read thousands of per-frame files on every run:
+the VTK pieces of ExportEULERIANData, one VTK file per eel and frame in
+ExportLagrangianData, and the Silo/VTK dumps of viz_eel2d_Str. The frame
+store ingests a run directory once and keeps everything on one grid:
+
+    python odor_frame_store.py RUN_DIR -o frame_store --nx 400 --ny 200
+
+Layout (a directory, no extra dependencies):
+
+    frame_store/
+        store.json                  manifest (grid, series, frame count)
+        x.npy, y.npy                sample coordinates of the grid
+        frames.npy                  IBAMR frame index per stored frame
+        times.npy                   simulation time per stored frame
+        U_x/chunk_00000.npy         (chunk_frames, ny, nx) per chunk
+        ...
+        eel_00/chunk_00000.npy      (chunk_frames, n_points, 2)
+
+Eulerian fields are resampled onto the store grid with AMRPatchResampler
+(or the scattered resampler for unstructured pieces); the Lagrangian
+points are stored per eel. Frames missing from a source are NaN.
+
+Chunks are plain .npy files and are opened with np.load(mmap_mode='r'),
+so reading one frame, a time slice or a spatial window only touches the
+pages it needs. The chunks are not compressed for that reason; use
+dtype='float32' (the default) to halve the size of double-precision
+output. Each chunk is written atomically and the manifest is updated
+after it, so an interrupted ingest leaves a valid store, and running the
+ingest again appends the frames that are not stored yet.
+"""
+
+import argparse
+import json
+import os
+import re
+import warnings
+from pathlib import Path
+
+import numpy as np
+
+STORE_VERSION = 1
+MANIFEST = 'store.json'
+
+# input2d: DT = 1e-4, viz_dump_interval = 40
+DEFAULT_DT = 1.0e-4
+DEFAULT_VIZ_DUMP_INTERVAL = 40
+
+
+def _save_atomic(path, array):
+    """np.save to a temporary file, then rename into place."""
+    tmp_file = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp_file, 'wb') as f:
+            np.save(f, np.ascontiguousarray(array))
+        os.replace(tmp_file, path)
+    finally:
+        if tmp_file.exists():
+            tmp_file.unlink()
+
+
+def _chunk_path(directory, name, k):
+    return Path(directory) / name / f"chunk_{k:05d}.npy"
+
+
+# ============================================================
+# SOURCES
+# ============================================================
+
+def find_run_frames(run_dir, viz_dump_interval=DEFAULT_VIZ_DUMP_INTERVAL):
+    """
+    Per-frame files of an IBAMR run directory.
+
+    Returns:
+    --------
+    eulerian : dict frame -> directory of VTK pieces
+    lagrangian : dict frame -> {eel index: VTK file}
+    viz : dict frame -> Silo file (dumps.visit.<iteration>.silo) or
+        directory of VTK pieces (visit_dump.<frame>)
+    """
+    run_dir = Path(run_dir)
+    eulerian, lagrangian, viz = {}, {}, {}
+
+    for base in (run_dir, run_dir / "ExportEULERIANData"):
+        for path in base.glob("visit_eulerian_db__*"):
+            match = re.fullmatch(r"visit_eulerian_db__(\d+)", path.name)
+            if match and path.is_dir():
+                eulerian.setdefault(int(match.group(1)), path)
+
+    for base in (run_dir, run_dir / "ExportLagrangianData"):
+        for path in base.glob("visit_lagrangian_db_*.vtk"):
+            match = re.fullmatch(r"visit_lagrangian_db__?(\d+)__?(\d+)\.vtk", path.name)
+            if match:
+                eel, frame = int(match.group(1)), int(match.group(2))
+                lagrangian.setdefault(frame, {}).setdefault(eel, path)
+
+    viz_dir = run_dir / "viz_eel2d_Str"
+    for path in viz_dir.glob("dumps.visit.*.silo"):
+        iteration = path.stem.split('.')[-1]
+        if iteration.isdigit() and int(iteration) % viz_dump_interval == 0:
+            viz.setdefault(int(iteration) // viz_dump_interval, path)
+    for path in viz_dir.glob("visit_dump.*"):
+        index = path.name.split('.')[-1]
+        if index.isdigit() and path.is_dir():
+            viz.setdefault(int(index), path)
+
+    return eulerian, lagrangian, viz
+
+
+def _read_silo_patch(path, names):
+    """Fields of a Silo (HDF5) dump as one node-centred patch, and its time."""
+    import h5py
+    from odor_resampling import StructuredPatch
+
+    aliases = {'C': ('C', 'concentration'), 'U': ('U', 'velocity_0'), 'V': ('V', 'velocity_1')}
+    with h5py.File(path, 'r') as f:
+        x, y = f['x'][:], f['y'][:]
+        fields = {}
+        for name in names:
+            key = next((k for k in aliases.get(name, (name,)) if k in f.keys()), None)
+            if key is not None:
+                fields[name] = f[key][:]
+        time = float(f.attrs['time']) if 'time' in f.attrs else None
+    x_axis, y_axis = x[0, :], y[:, 0]
+    spacing = (x_axis[1] - x_axis[0], y_axis[1] - y_axis[0])
+    patch = StructuredPatch((x_axis[0], y_axis[0]), spacing, x.shape, fields,
+                            level=0, centering='node')
+    return patch, time
+
+
+def default_grid(eulerian, viz, x_range=None, y_range=None, nx=None, ny=None, fields=None):
+    """
+    Store grid: the given extent and resolution, completed from the data.
+
+    Missing values come from the first Eulerian frame (bounding box of its
+    patches at the finest spacing), or else from the first viz dump;
+    fields limits the arrays read for that (default: all).
+
+    Returns:
+    --------
+    x, y : ndarray
+        Uniformly spaced sample coordinates (cell centres of the extent)
+    """
+    from odor_resampling import load_amr_patches
+
+    if None in (x_range, y_range) or None in (nx, ny):
+        patches = []
+        for frames in (eulerian, viz):
+            if frames and not patches:
+                source = frames[min(frames)]
+                try:
+                    if source.is_dir():
+                        patches = load_amr_patches(source, fields=fields)
+                    else:
+                        patches = [_read_silo_patch(source, fields or ())[0]]
+                except (ImportError, OSError, ValueError):
+                    patches = []
+        if not patches:
+            raise ValueError("Cannot infer the store grid from the run directory; "
+                             "give x_range, y_range, nx and ny")
+        lo = np.min([p.origin for p in patches], axis=0)
+        hi = np.max([[p.origin[k] + p.spacing[k] * (p.shape[1 - k] - (p.centering == 'node'))
+                      for k in range(2)] for p in patches], axis=0)
+        h = np.min([p.spacing for p in patches], axis=0)
+        x_range = x_range or (lo[0], hi[0])
+        y_range = y_range or (lo[1], hi[1])
+        nx = nx or max(int(round((x_range[1] - x_range[0]) / h[0])), 1)
+        ny = ny or max(int(round((y_range[1] - y_range[0]) / h[1])), 1)
+
+    hx = (x_range[1] - x_range[0]) / nx
+    hy = (y_range[1] - y_range[0]) / ny
+    x = x_range[0] + (np.arange(nx) + 0.5) * hx
+    y = y_range[0] + (np.arange(ny) + 0.5) * hy
+    return x, y
+
+
+# ============================================================
+# INGEST
+# ============================================================
+
+def ingest_run(run_dir, store_dir, x_range=None, y_range=None, nx=None, ny=None,
+               eulerian_fields=('U_x', 'U_y', 'Omega'), viz_fields=('C',),
+               chunk_frames=32, dtype='float32', dt=DEFAULT_DT,
+               viz_dump_interval=DEFAULT_VIZ_DUMP_INTERVAL, method='bilinear'):
+    """
+    Convert the per-frame output of a run into a frame store.
+
+    An existing store is extended with the frames after its last one (its
+    grid and series are kept; the other grid arguments are ignored).
+
+    Parameters:
+    -----------
+    run_dir : str or Path
+        Directory with ExportEULERIANData, ExportLagrangianData and/or
+        viz_eel2d_Str
+    store_dir : str or Path
+        Store directory (created if missing)
+    x_range, y_range, nx, ny : optional
+        Store grid (see default_grid)
+    eulerian_fields : tuple of str
+        Arrays read from the ExportEULERIANData pieces
+    viz_fields : tuple of str
+        Arrays read from the viz_eel2d_Str dumps (C, U, V, Omega, ...)
+    chunk_frames : int
+        Frames per chunk file
+    dtype : str
+        Storage type of the fields
+    dt, viz_dump_interval : float, int
+        Time step and dump interval; frame k is at t = k · interval · dt
+        unless the dump records its time
+    method : str
+        AMRPatchResampler method ('bilinear' or 'average')
+
+    Returns:
+    --------
+    store : FrameStore
+    """
+    from odor_resampling import AMRPatchResampler, get_scattered_resampler, load_amr_patches
+    from odor_vtk_reader import read_point_cloud, read_vtk
+
+    overlap = set(eulerian_fields) & set(viz_fields)
+    if overlap:
+        raise ValueError(f"Fields {sorted(overlap)} requested from both the Eulerian "
+                         f"and the viz output")
+    if chunk_frames < 1:
+        raise ValueError(f"chunk_frames must be >= 1, got {chunk_frames}")
+
+    store_dir = Path(store_dir)
+    eulerian, lagrangian, viz = find_run_frames(run_dir, viz_dump_interval)
+    all_frames = sorted(set(eulerian) | set(lagrangian) | set(viz))
+    if not all_frames:
+        raise ValueError(f"No IBAMR output found in {run_dir}")
+
+    manifest_file = store_dir / MANIFEST
+    if manifest_file.exists():
+        existing = FrameStore(store_dir)
+        manifest = existing.manifest
+        x, y = existing.x, existing.y
+        frames = list(existing.frames)
+        times = list(existing.times)
+        chunk_frames = manifest['chunk_frames']
+        dtype = manifest['dtype']
+        new_frames = [f for f in all_frames if not frames or f > frames[-1]]
+    else:
+        x, y = default_grid(eulerian, viz, x_range, y_range, nx, ny,
+                            tuple(eulerian_fields) + tuple(viz_fields))
+        manifest = {'version': STORE_VERSION, 'chunk_frames': chunk_frames, 'dtype': dtype,
+                    'n_frames': 0, 'series': {},
+                    'dt': dt, 'viz_dump_interval': viz_dump_interval,
+                    'run_dir': str(Path(run_dir).resolve())}
+        frames, times = [], []
+        new_frames = all_frames
+        store_dir.mkdir(parents=True, exist_ok=True)
+        _save_atomic(store_dir / 'x.npy', x)
+        _save_atomic(store_dir / 'y.npy', y)
+
+    series = manifest['series']
+    added = [n for n in tuple(eulerian_fields) + tuple(viz_fields) if n not in series]
+    if frames and added:
+        raise ValueError(f"{store_dir} has no series {added}; ingest them into a new store")
+    for name in tuple(eulerian_fields) + tuple(viz_fields):
+        series.setdefault(name, {'shape': [len(y), len(x)], 'source': 'eulerian'
+                                 if name in eulerian_fields else 'viz'})
+
+    print(f"[STORE] {store_dir}: {len(frames)} frames stored, {len(new_frames)} to ingest "
+          f"onto {len(x)}×{len(y)}")
+    if not new_frames:
+        return FrameStore(store_dir)
+
+    resampler = AMRPatchResampler(x, y, method=method)
+    X_grid, Y_grid = np.meshgrid(x, y)
+    have_h5py = True
+
+    # Current chunk: reload a partial last chunk so it is completed
+    n_done = len(frames)
+    chunk = n_done // chunk_frames
+    buffers = {}
+
+    def buffer_for(name, shape):
+        if name not in buffers:
+            block = np.full((chunk_frames,) + tuple(shape), np.nan, dtype=dtype)
+            path = _chunk_path(store_dir, name, chunk)
+            if n_done % chunk_frames and path.exists():
+                old = np.load(path)
+                block[:old.shape[0]] = old
+            buffers[name] = block
+        return buffers[name]
+
+    def flush(n_frames):
+        # Every series gets a chunk (all NaN if the frames had no data)
+        for name, entry in series.items():
+            buffer_for(name, entry['shape'])
+        for name, block in buffers.items():
+            path = _chunk_path(store_dir, name, chunk)
+            path.parent.mkdir(exist_ok=True)
+            _save_atomic(path, block[:n_frames - chunk * chunk_frames])
+        _save_atomic(store_dir / 'frames.npy', np.array(frames, dtype=np.int64))
+        _save_atomic(store_dir / 'times.npy', np.array(times, dtype=np.float64))
+        manifest['n_frames'] = n_frames
+        tmp_manifest = manifest_file.with_name(f"{MANIFEST}.{os.getpid()}.tmp")
+        tmp_manifest.write_text(json.dumps(manifest, indent=1))
+        os.replace(tmp_manifest, manifest_file)
+
+    for frame in new_frames:
+        row = len(frames) - chunk * chunk_frames
+        time = frame * viz_dump_interval * dt
+
+        if frame in eulerian:
+            values = {}
+            try:
+                patches = load_amr_patches(eulerian[frame], fields=eulerian_fields)
+                names = [n for n in eulerian_fields if patches and all(n in p.fields for p in patches)]
+                if names:
+                    values = dict(zip(names, resampler.resample(patches, names)))
+            except ValueError:
+                vtk_files = sorted(eulerian[frame].glob("*.vtk"))
+                points, arrays = read_point_cloud(vtk_files, eulerian_fields)
+                if points is not None and arrays:
+                    names = list(arrays)
+                    resampled = get_scattered_resampler(points, X_grid, Y_grid).resample(
+                        *[arrays[n] for n in names])
+                    values = dict(zip(names, resampled))
+            for name, field in values.items():
+                buffer_for(name, series[name]['shape'])[row] = field
+
+        if frame in viz and viz_fields:
+            source = viz[frame]
+            patches = []
+            try:
+                if source.is_dir():
+                    patches = load_amr_patches(source, fields=viz_fields)
+                elif have_h5py:
+                    patch, recorded = _read_silo_patch(source, viz_fields)
+                    patches = [patch]
+                    time = recorded if recorded is not None else time
+            except ImportError:
+                have_h5py = False
+                warnings.warn("h5py is not installed; skipping the Silo dumps")
+            except (OSError, ValueError) as e:
+                warnings.warn(f"Could not read {source}: {e}")
+            names = [n for n in viz_fields if patches and all(n in p.fields for p in patches)]
+            if names:
+                for name, field in zip(names, resampler.resample(patches, names)):
+                    buffer_for(name, series[name]['shape'])[row] = field
+
+        for eel, path in sorted(lagrangian.get(frame, {}).items()):
+            try:
+                points = np.asarray(read_vtk(path, fields=()).points[:, :2])
+            except (OSError, ValueError) as e:
+                warnings.warn(f"Could not read {path}: {e}")
+                continue
+            name = f"eel_{eel:02d}"
+            entry = series.setdefault(name, {'shape': list(points.shape), 'source': 'lagrangian'})
+            if list(points.shape) != entry['shape']:
+                warnings.warn(f"{path}: {points.shape[0]} points, {name} has "
+                              f"{entry['shape'][0]}; frame {frame} left empty")
+                continue
+            buffer_for(name, entry['shape'])[row] = points
+
+        frames.append(frame)
+        times.append(time)
+
+        if len(frames) % chunk_frames == 0:
+            flush(len(frames))
+            print(f"[STORE] Chunk {chunk} written (frames up to {frame})")
+            chunk += 1
+            n_done = len(frames)
+            buffers = {}
+
+    if len(frames) % chunk_frames:
+        flush(len(frames))
+    print(f"[STORE] {len(frames)} frames in {store_dir}")
+    return FrameStore(store_dir)
+
+
+# ============================================================
+# READING
+# ============================================================
+
+class FrameStore:
+    """
+    Read access to a frame store; all field data is memory-mapped.
+
+    Usage:
+
+        store = FrameStore('frame_store')
+        u_x = store.field('U_x', frame=100)             # (ny, nx) view
+        c = store.series('C', x_range=(-1, 1), y_range=(-0.5, 0.5))
+        eels = store.eel_points(100)
+    """
+
+    def __init__(self, path):
+        """
+        Parameters:
+        -----------
+        path : str or Path
+            Store directory written by ingest_run
+        """
+        self.path = Path(path)
+        self.manifest = json.loads((self.path / MANIFEST).read_text())
+        if self.manifest.get('version') != STORE_VERSION:
+            raise ValueError(f"{self.path}: unsupported store version {self.manifest.get('version')}")
+        n = self.manifest['n_frames']
+        self.chunk_frames = self.manifest['chunk_frames']
+        self.x = np.load(self.path / 'x.npy')
+        self.y = np.load(self.path / 'y.npy')
+        self.frames = np.load(self.path / 'frames.npy')[:n] if n else np.zeros(0, dtype=np.int64)
+        self.times = np.load(self.path / 'times.npy')[:n] if n else np.zeros(0)
+        self._positions = {int(f): k for k, f in enumerate(self.frames)}
+        self._chunks = {}
+
+    @property
+    def n_frames(self):
+        return len(self.frames)
+
+    @property
+    def fields(self):
+        """Names of the gridded fields."""
+        return [name for name, s in self.manifest['series'].items() if s['source'] != 'lagrangian']
+
+    @property
+    def iterations(self):
+        """IBAMR iteration number of each frame."""
+        return self.frames * self.manifest['viz_dump_interval']
+
+    @property
+    def spacing(self):
+        return (self.x[1] - self.x[0] if self.x.size > 1 else 1.0,
+                self.y[1] - self.y[0] if self.y.size > 1 else 1.0)
+
+    def has_frame(self, frame):
+        return int(frame) in self._positions
+
+    def has_data(self, name, frame=None, time=None, iteration=None):
+        """Whether a series has data for a frame (frames missing from its source are NaN)."""
+        if name not in self.manifest['series']:
+            return False
+        try:
+            index = self.index(frame, time, iteration)
+        except KeyError:
+            return False
+        return not np.isnan(self.field(name, index=index).flat[0])
+
+    def index(self, frame=None, time=None, iteration=None):
+        """
+        Position of a frame in the store.
+
+        frame and iteration must be stored exactly; time picks the nearest
+        stored frame.
+        """
+        if iteration is not None:
+            interval = self.manifest['viz_dump_interval']
+            if iteration % interval:
+                raise KeyError(f"Iteration {iteration} is not a dump (interval {interval})")
+            frame = iteration // interval
+        if frame is not None:
+            if int(frame) not in self._positions:
+                raise KeyError(f"Frame {frame} is not in {self.path}")
+            return self._positions[int(frame)]
+        if time is not None:
+            if not self.n_frames:
+                raise KeyError(f"{self.path} is empty")
+            return int(np.argmin(np.abs(self.times - time)))
+        raise ValueError("Give frame, time or iteration")
+
+    def _chunk(self, name, k):
+        key = (name, k)
+        if key not in self._chunks:
+            if name not in self.manifest['series']:
+                raise KeyError(f"No series '{name}' in {self.path} "
+                               f"(available: {list(self.manifest['series'])})")
+            path = _chunk_path(self.path, name, k)
+            if path.exists():
+                self._chunks[key] = np.load(path, mmap_mode='r')
+            else:
+                # Series that first appeared in a later chunk (e.g. an eel)
+                n = min(self.chunk_frames, self.n_frames - k * self.chunk_frames)
+                shape = (n,) + tuple(self.manifest['series'][name]['shape'])
+                self._chunks[key] = np.full(shape, np.nan, dtype=self.manifest['dtype'])
+        return self._chunks[key]
+
+    def field(self, name, frame=None, time=None, iteration=None, index=None):
+        """One frame of a series as a read-only view (ny, nx) or (n_points, 2)."""
+        if index is None:
+            index = self.index(frame, time, iteration)
+        k, row = divmod(index, self.chunk_frames)
+        return self._chunk(name, k)[row]
+
+    def window(self, x_range=None, y_range=None):
+        """Index slices (rows, columns) of the samples inside a spatial window."""
+        def axis_slice(coords, bounds):
+            if bounds is None:
+                return slice(None)
+            lo, hi = np.searchsorted(coords, bounds[0]), np.searchsorted(coords, bounds[1], 'right')
+            return slice(int(lo), int(hi))
+        return axis_slice(self.y, y_range), axis_slice(self.x, x_range)
+
+    def series(self, name, start=0, stop=None, x_range=None, y_range=None):
+        """
+        Frames [start, stop) of a field, optionally cut to a window.
+
+        Only the chunks in the range are opened and only the rows of the
+        window are read from them.
+
+        Returns:
+        --------
+        values : ndarray (n, ny_window, nx_window)
+        """
+        stop = self.n_frames if stop is None else min(stop, self.n_frames)
+        rows, cols = self.window(x_range, y_range)
+        parts = []
+        for k in range(start // self.chunk_frames, -(-stop // self.chunk_frames)):
+            lo = max(start - k * self.chunk_frames, 0)
+            hi = min(stop - k * self.chunk_frames, self.chunk_frames)
+            parts.append(self._chunk(name, k)[lo:hi, rows, cols])
+        if not parts:
+            shape = self._chunk(name, 0).shape[1:] if self.n_frames else (0, 0)
+            return np.zeros((0,) + shape)[:, rows, cols]
+        return np.concatenate(parts)
+
+    def grid_points(self):
+        """Sample coordinates (ny·nx, 3), x fastest (as the flattened fields)."""
+        X, Y = np.meshgrid(self.x, self.y)
+        return np.column_stack((X.ravel(), Y.ravel(), np.zeros(X.size)))
+
+    def patch(self, names, frame=None, time=None, iteration=None):
+        """
+        One frame of several fields as a StructuredPatch, for resampling
+        onto another grid with AMRPatchResampler.
+        """
+        from odor_resampling import StructuredPatch
+
+        index = self.index(frame, time, iteration)
+        fields = {name: self.field(name, index=index) for name in names}
+        return StructuredPatch((self.x[0], self.y[0]), self.spacing, (len(self.y), len(self.x)),
+                               fields, level=0, centering='node')
+
+    def eel_points(self, frame=None, time=None, iteration=None):
+        """Stored eel outlines of a frame: list of (n_points, 2) arrays (None if none)."""
+        index = self.index(frame, time, iteration)
+        names = sorted(name for name, s in self.manifest['series'].items()
+                       if s['source'] == 'lagrangian')
+        eels = []
+        for name in names:
+            points = self.field(name, index=index)
+            if np.isnan(points).any():
+                break
+            eels.append(np.asarray(points))
+        return eels or None
+
+    def __repr__(self):
+        return (f"FrameStore({self.path}, {self.n_frames} frames, {len(self.x)}×{len(self.y)}, "
+                f"series={list(self.manifest['series'])})")
+
+
+_open_stores = {}
+
+
+def get_frame_store(path):
+    """
+    The FrameStore at path, or None if there is none.
+
+    Stores are kept open per path (their chunk maps are reused); a store
+    that has grown since it was opened is reopened.
+    """
+    if path is None:
+        return None
+    path = Path(path)
+    manifest_file = path / MANIFEST
+    if not manifest_file.exists():
+        return None
+    key = str(path.resolve())
+    mtime = manifest_file.stat().st_mtime_ns
+    cached = _open_stores.get(key)
+    if cached is None or cached[0] != mtime:
+        _open_stores[key] = (mtime, FrameStore(path))
+    return _open_stores[key][1]
+
+
+def read_store_frame(path, names, optional=(), frame=None, iteration=None):
+    """
+    One frame of a store as plain arrays, for scripts that read per-frame files.
+
+    Returns:
+    --------
+    data : dict or None
+        name -> (ny, nx) view for names and the stored optional names,
+        plus 'x', 'y' (2D grids) and 'time'; None if there is no store at
+        path or it lacks the frame or one of names
+    """
+    store = get_frame_store(path)
+    if store is None or not all(store.has_data(n, frame, iteration=iteration) for n in names):
+        return None
+    index = store.index(frame, iteration=iteration)
+    data = {n: store.field(n, index=index) for n in names}
+    for name in optional:
+        if store.has_data(name, frame, iteration=iteration):
+            data[name] = store.field(name, index=index)
+    data['x'], data['y'] = np.meshgrid(store.x, store.y)
+    data['time'] = float(store.times[index])
+    return data
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Ingest the per-frame output of an IBAMR run into a frame store")
+    parser.add_argument('run_dir', help="Run directory (ExportEULERIANData, "
+                                        "ExportLagrangianData, viz_eel2d_Str)")
+    parser.add_argument('-o', '--output', default='frame_store', help="Store directory")
+    parser.add_argument('--x-range', type=float, nargs=2, metavar=('X0', 'X1'))
+    parser.add_argument('--y-range', type=float, nargs=2, metavar=('Y0', 'Y1'))
+    parser.add_argument('--nx', type=int)
+    parser.add_argument('--ny', type=int)
+    parser.add_argument('--fields', nargs='*', default=['U_x', 'U_y', 'Omega'],
+                        help="Eulerian arrays to store")
+    parser.add_argument('--viz-fields', nargs='*', default=['C'],
+                        help="viz_eel2d_Str arrays to store")
+    parser.add_argument('--chunk-frames', type=int, default=32)
+    parser.add_argument('--dtype', default='float32', choices=['float32', 'float64'])
+    parser.add_argument('--dt', type=float, default=DEFAULT_DT)
+    parser.add_argument('--viz-dump-interval', type=int, default=DEFAULT_VIZ_DUMP_INTERVAL)
+    parser.add_argument('--method', default='bilinear', choices=['bilinear', 'average'])
+    args = parser.parse_args(argv)
+
+    store = ingest_run(args.run_dir, args.output, args.x_range, args.y_range, args.nx, args.ny,
+                       tuple(args.fields), tuple(args.viz_fields), args.chunk_frames,
+                       args.dtype, args.dt, args.viz_dump_interval, args.method)
+    print(store)
+
+
+if __name__ == "__main__":
+    main()
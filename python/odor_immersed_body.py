@@ -0,0 +1,505 @@
+#!/usr/bin/env python3
+"""
+Immersed-Body Masking for Odor Transport
+
+Keeps odor out of the fish bodies in OdorTransportSolverCN replays. The
+four eels of input2d are given as Lagrangian point clouds (the .vertex
+files in geometry/, or the ExportLagrangianData VTK files of a run):
+
+    eel2d_k.vertex : N, then N lines "x y", ordered by cross-section
+                     (one column of points per section along the body)
+
+The point ordering is the same in every frame, so the outline of a body
+is fixed by index: the lowest and highest point of every section in the
+reference (vertex file) configuration, tail to head along one side and
+back along the other. In a deformed frame the same indices give the
+deformed outline.
+
+Rasterization:
+--------------
+Each outline is filled onto the solver grid with an even-odd scanline
+fill: a cell belongs to the body if its centre lies inside the polygon.
+Edge crossings of all scanlines in the bounding box of the body are
+computed at once and turned into runs of a difference array, so a fill
+costs O(edges + bounding box) rather than O(N). A body whose points are
+unchanged is skipped; a moved body only touches its old and new
+bounding boxes.
+
+No-flux treatment:
+------------------
+Before a step, body cells are filled with the mean of their fluid
+neighbours (ghost values), so the normal gradient and the diffusive flux
+across the body surface vanish. After the step, the mass that every body
+cell holds beyond its ghost value is returned through the surface cell
+it entered by: a cell whose highest neighbour is a higher body cell
+follows it up the gradient until it reaches a surface cell, whose fluid
+neighbours then receive the mass in proportion to the faces they share
+with it. Mass the body swept over since the last step goes to the
+nearest surface cell of the same body. The body cells are then cleared.
+Odor that enters one side of a body thus comes back out on that side,
+not next to another body or behind it; no odor is left inside a body,
+and the correction itself changes no mass. The routing tables are built
+when the bodies move; a step costs O(body cells · log).
+
+Within the implicit solve the body cells still diffuse, so a body only
+a few cells thick passes a small fraction of the odor at its surface per
+step, decaying by about D·Δt/h² / (1 + 4·D·Δt/h²) per cell of thickness.
+Behind a 6-cell wall, 2e-7 of a plume arrives where 2e-4 would without
+the wall (python odor_immersed_body.py).
+
+The ghost values do not stop upwind convection from carrying odor out of
+the body side of a face when the grid velocity there points away from
+the body. With IBAMR velocities (no-slip, u equal to the body velocity
+at the surface) this flux is small. A uniform stream forced through the
+bodies instead changes the mass by about 1e-4 over a pass.
+"""
+
+import numpy as np
+from pathlib import Path
+from scipy import sparse
+from scipy.ndimage import distance_transform_edt
+
+
+def read_vertex_file(vertex_file):
+    """
+    Read an IBAMR .vertex file.
+
+    Parameters:
+    -----------
+    vertex_file : str or Path
+        File with the point count on the first line, then "x y" per point
+
+    Returns:
+    --------
+    points : ndarray (n, 2)
+    """
+    with open(vertex_file, 'r') as f:
+        n_vertices = int(f.readline().strip())
+        points = np.loadtxt(f, ndmin=2)
+    if points.shape[0] != n_vertices:
+        raise ValueError(f"{vertex_file}: header says {n_vertices} vertices, "
+                         f"found {points.shape[0]}")
+    return points[:, :2]
+
+
+def outline_indices(reference_points):
+    """
+    Point indices of the closed outline of a section-ordered body.
+
+    Sections are runs of equal x in the reference configuration; the
+    outline visits the lowest point of every section from the first to the
+    last section, then the highest point from the last back to the first.
+
+    Parameters:
+    -----------
+    reference_points : ndarray (n, 2)
+        Undeformed body, e.g. read_vertex_file('geometry/eel2d_1.vertex')
+
+    Returns:
+    --------
+    indices : ndarray of int
+    """
+    x, y = reference_points[:, 0], reference_points[:, 1]
+    starts = np.flatnonzero(np.r_[True, x[1:] != x[:-1]])
+    ends = np.r_[starts[1:], x.size]
+    lower = np.array([s + np.argmin(y[s:e]) for s, e in zip(starts, ends)])
+    upper = np.array([s + np.argmax(y[s:e]) for s, e in zip(starts, ends)])
+    return np.concatenate((lower, upper[::-1]))
+
+
+def scanline_fill(polygon, x, y):
+    """
+    Cells of a grid whose centres lie inside a polygon (even-odd rule).
+
+    Parameters:
+    -----------
+    polygon : ndarray (m, 2)
+        Vertices in order (closed implicitly)
+    x, y : ndarray
+        1D uniform grid coordinates
+
+    Returns:
+    --------
+    j0, i0 : int
+        Grid index of the lower-left corner of the bounding box
+    inside : ndarray of bool (nj, ni)
+        Body cells within the bounding box (empty if the polygon misses
+        every cell centre)
+    """
+    xa, ya = polygon[:, 0], polygon[:, 1]
+    xb, yb = np.roll(xa, -1), np.roll(ya, -1)
+
+    # Bounding box in cell indices
+    j0 = int(np.searchsorted(y, ya.min(), 'left'))
+    j1 = int(np.searchsorted(y, ya.max(), 'right')) - 1
+    i0 = int(np.searchsorted(x, xa.min(), 'left'))
+    i1 = int(np.searchsorted(x, xa.max(), 'right')) - 1
+    if j1 < j0 or i1 < i0:
+        return 0, 0, np.zeros((0, 0), dtype=bool)
+
+    # Scanlines crossing each edge, half-open in y (lo ≤ y_j < hi); the
+    # same comparison at a shared vertex keeps the crossing count even
+    sloped = ya != yb
+    xa, ya, xb, yb = xa[sloped], ya[sloped], xb[sloped], yb[sloped]
+    first = np.searchsorted(y, np.minimum(ya, yb), 'left')
+    last = np.searchsorted(y, np.maximum(ya, yb), 'left') - 1
+    counts = np.maximum(last - first + 1, 0)
+
+    edge = np.repeat(np.arange(counts.size), counts)
+    rows = first[edge] + (np.arange(edge.size) - np.repeat(np.cumsum(counts) - counts, counts))
+    x_cross = xa[edge] + (y[rows] - ya[edge]) * (xb[edge] - xa[edge]) / (yb[edge] - ya[edge])
+
+    # Consecutive crossings of a scanline bound the inside runs
+    order = np.lexsort((x_cross, rows))
+    rows, x_cross = rows[order], x_cross[order]
+    run_rows = rows[0::2] - j0
+    run_start = np.searchsorted(x, x_cross[0::2], 'left') - i0
+    run_end = np.searchsorted(x, x_cross[1::2], 'right') - 1 - i0
+    keep = run_start <= run_end
+
+    diff = np.zeros((j1 - j0 + 1, i1 - i0 + 2), dtype=np.int32)
+    np.add.at(diff, (run_rows[keep], run_start[keep]), 1)
+    np.add.at(diff, (run_rows[keep], run_end[keep] + 1), -1)
+    inside = np.cumsum(diff[:, :-1], axis=1) > 0
+    return j0, i0, inside
+
+
+class ImmersedBodyMask:
+    """
+    Rasterized fish bodies on a solver grid, with no-flux enforcement.
+
+    Attach to a solver with OdorTransportSolverCN.set_immersed_bodies and
+    call update() with the Lagrangian points of every frame.
+    """
+
+    def __init__(self, x, y, reference_bodies, boundary_type='neumann', names=None):
+        """
+        Parameters:
+        -----------
+        x, y : ndarray
+            1D grid coordinates of the solver
+        reference_bodies : list of ndarray (n_k, 2)
+            Undeformed point cloud of every body (defines the outline)
+        boundary_type : str
+            Neighbours wrap around for 'periodic'
+        names : list of str, optional
+            Body labels
+        """
+        self.x, self.y = np.asarray(x), np.asarray(y)
+        self.nx, self.ny = self.x.size, self.y.size
+        self.periodic = boundary_type == 'periodic'
+        self.names = list(names) if names is not None else \
+            [f"body_{k}" for k in range(len(reference_bodies))]
+
+        self._outlines = [outline_indices(np.asarray(points)[:, :2])
+                          for points in reference_bodies]
+        self._points = [None] * len(reference_bodies)
+        self._rasters = [(0, 0, np.zeros((0, 0), dtype=bool))] * len(reference_bodies)
+
+        # Number of bodies covering each cell (bodies may overlap)
+        self._count = np.zeros((self.ny, self.nx), dtype=np.uint8)
+        self.mask = np.zeros((self.ny, self.nx), dtype=bool)
+        self.cells = np.zeros(0, dtype=np.int64)
+        self.updates = 0
+
+        self._set_cells()
+        self.update(reference_bodies)
+
+    @classmethod
+    def from_vertex_files(cls, x, y, vertex_files, boundary_type='neumann'):
+        """
+        Mask for the bodies of IBAMR .vertex files, placed as in the files.
+
+        Parameters:
+        -----------
+        x, y : ndarray
+            1D grid coordinates of the solver
+        vertex_files : list of str or Path
+            e.g. geometry/eel2d_1.vertex ... eel2d_4.vertex
+        boundary_type : str
+            Solver boundary type
+        """
+        bodies = [read_vertex_file(f) for f in vertex_files]
+        return cls(x, y, bodies, boundary_type, names=[Path(f).stem for f in vertex_files])
+
+    @property
+    def n_bodies(self):
+        return len(self._outlines)
+
+    def update(self, bodies):
+        """
+        Re-rasterize the bodies that moved.
+
+        Parameters:
+        -----------
+        bodies : list of ndarray (n_k, 2 or 3)
+            Current Lagrangian points of every body, in the ordering of
+            the reference configuration (extra columns such as z are
+            ignored)
+
+        Returns:
+        --------
+        n_moved : int
+            Number of bodies re-rasterized
+        """
+        if len(bodies) != self.n_bodies:
+            raise ValueError(f"Expected {self.n_bodies} bodies, got {len(bodies)}")
+
+        n_moved = 0
+        for k, points in enumerate(bodies):
+            points = np.asarray(points)[:, :2]
+            if self._points[k] is not None and np.array_equal(points, self._points[k]):
+                continue
+            self._points[k] = points.copy()
+
+            j0, i0, inside = self._rasters[k]
+            self._count[j0:j0 + inside.shape[0], i0:i0 + inside.shape[1]] -= inside
+            j0, i0, inside = scanline_fill(points[self._outlines[k]], self.x, self.y)
+            self._count[j0:j0 + inside.shape[0], i0:i0 + inside.shape[1]] += inside
+            self._rasters[k] = (j0, i0, inside)
+            n_moved += 1
+
+        if n_moved:
+            # Only the bounding boxes of the bodies can hold body cells
+            cells = []
+            for j0, i0, inside in self._rasters:
+                jj, ii = np.nonzero(inside)
+                cells.append((jj + j0) * self.nx + ii + i0)
+            self.mask[self.cells // self.nx, self.cells % self.nx] = False
+            self._set_cells(np.unique(np.concatenate(cells)))
+            self.mask[self.cells // self.nx, self.cells % self.nx] = True
+            self.updates += 1
+        return n_moved
+
+    def _set_cells(self, cells=None):
+        """Body cells and their fluid neighbours (flat indices)."""
+        self.cells = np.zeros(0, dtype=np.int64) if cells is None else cells
+        j, i = np.divmod(self.cells, self.nx)
+
+        neighbours = []
+        valid = []
+        for dj, di in ((0, -1), (0, 1), (-1, 0), (1, 0)):
+            jn, in_ = j + dj, i + di
+            if self.periodic:
+                jn, in_ = jn % self.ny, in_ % self.nx
+                ok = np.ones(jn.shape, dtype=bool)
+            else:
+                ok = (jn >= 0) & (jn < self.ny) & (in_ >= 0) & (in_ < self.nx)
+                jn, in_ = np.clip(jn, 0, self.ny - 1), np.clip(in_, 0, self.nx - 1)
+            neighbours.append(jn * self.nx + in_)
+            valid.append(ok)
+        self._neighbours = np.stack(neighbours, axis=1).reshape(-1, 4)
+        # Weight 1 for faces shared with a fluid cell
+        self._weights = np.stack(valid, axis=1).reshape(-1, 4).astype(np.float64)
+        self._weights *= self._count.reshape(-1)[self._neighbours] == 0
+        n_faces = self._weights.sum(axis=1)
+        self._ghost_scale = np.divide(1.0, n_faces, out=np.zeros_like(n_faces),
+                                      where=n_faces > 0)
+
+        # Body cells next to each body cell (positions in self.cells, -1 if
+        # fluid) and the nearest surface cell of the same body
+        position = np.full(self.ny * self.nx, -1, dtype=np.int64)
+        position[self.cells] = np.arange(self.cells.size)
+        self._body_neighbours = position[self._neighbours]
+        self._body_neighbours[~np.stack(valid, axis=1).reshape(-1, 4)] = -1
+        self._surface = n_faces > 0
+        self._interior = np.flatnonzero(~self._surface)
+        self._route = self._nearest_surface(position)
+
+        # Fluid cells that receive the mass of each surface cell, by shared faces
+        weights = (self._weights * self._ghost_scale[:, None]).reshape(-1)
+        rows = self._neighbours.reshape(-1)
+        columns = np.repeat(np.arange(self.cells.size), 4)
+        keep = weights > 0
+        returned = sparse.csr_matrix((weights[keep], (rows[keep], columns[keep])),
+                                     shape=(self.ny * self.nx, self.cells.size))
+        self._targets = np.flatnonzero(np.diff(returned.indptr))
+        self._return = returned[self._targets]
+        self._carry = np.zeros(self.cells.size)
+        self._ghosts = np.zeros(self.cells.size)
+
+    def _nearest_surface(self, position):
+        """
+        Nearest surface cell (one with fluid neighbours) of every body cell.
+
+        Found with a distance transform over the bounding box of each body,
+        so a cell inside one body is never routed to another. Cells that
+        only lie under surface cells of other bodies fall back to the
+        nearest surface cell of any body.
+
+        Returns:
+        --------
+        route : ndarray of int
+            Position in self.cells (surface cells map to themselves)
+        """
+        route = np.arange(self.cells.size)
+        if self._interior.size == 0 or not self._surface.any():
+            return route
+        is_surface = np.zeros((self.ny, self.nx), dtype=bool)
+        is_surface.reshape(-1)[self.cells[self._surface]] = True
+
+        for j0, i0, inside in self._rasters:
+            box = (slice(j0, j0 + inside.shape[0]), slice(i0, i0 + inside.shape[1]))
+            own_surface = inside & is_surface[box]
+            interior = inside & ~own_surface
+            if not own_surface.any() or not interior.any():
+                continue
+            _, (jn, in_) = distance_transform_edt(~own_surface, return_indices=True)
+            jj, ii = np.nonzero(interior)
+            cells = position[(jj + j0) * self.nx + ii + i0]
+            nearest = position[(jn[jj, ii] + j0) * self.nx + in_[jj, ii] + i0]
+            # A cell covered by several bodies keeps its first route
+            unset = route[cells] == cells
+            route[cells[unset]] = nearest[unset]
+
+        unrouted = ~self._surface[route]
+        if unrouted.any():
+            _, (jn, in_) = distance_transform_edt(~is_surface, return_indices=True)
+            j, i = np.divmod(self.cells[unrouted], self.nx)
+            route[unrouted] = position[jn[j, i] * self.nx + in_[j, i]]
+        return route
+
+    def _upstream_surface(self, flat, values):
+        """
+        Surface cell through which every body cell received its odor.
+
+        Odor inside a body has diffused in from the surface, possibly from
+        the far side of a thin body. Each cell whose highest neighbour is a
+        higher body cell follows that neighbour (steepest ascent, resolved
+        by pointer jumping in O(body cells · log)); the path ends at a
+        surface cell whose fluid neighbours supplied it. Interior cells
+        without a higher neighbour use the nearest surface cell.
+        """
+        n = self.cells.size
+        neighbours = self._body_neighbours
+        body_values = np.where(neighbours >= 0, values[neighbours], -np.inf)
+        fluid_values = np.where(self._weights > 0, flat[self._neighbours], -np.inf)
+        best = np.argmax(body_values, axis=1)
+        best_value = body_values[np.arange(n), best]
+        follow = (best_value > values) & (best_value > fluid_values.max(axis=1))
+
+        upstream = np.arange(n)
+        upstream[self._interior] = self._route[self._interior]
+        upstream[follow] = neighbours[np.arange(n), best][follow]
+        while True:
+            jumped = upstream[upstream]
+            if np.array_equal(jumped, upstream):
+                return upstream
+            upstream = jumped
+
+    def fill_ghosts(self, c):
+        """
+        Set body cells to the mean of their fluid neighbours (before a step).
+
+        Mass already in the body cells (e.g. swept over by a moving body)
+        is remembered and returned by redistribute().
+
+        Parameters:
+        -----------
+        c : ndarray (ny, nx)
+            Concentration, modified in place
+        """
+        if self.cells.size == 0:
+            return
+        flat = c.reshape(-1)
+        np.take(flat, self.cells, out=self._carry)
+        self._ghosts[:] = np.sum(flat[self._neighbours] * self._weights, axis=1) * self._ghost_scale
+        flat[self.cells] = self._ghosts
+
+    def redistribute(self, c):
+        """
+        Return the mass in body cells to the adjacent fluid (after a step).
+
+        Each body cell's excess over its ghost value leaves through the
+        surface cell it came in by, to that cell's fluid neighbours; mass
+        swept over by a moving body goes to the nearest surface cell.
+
+        Parameters:
+        -----------
+        c : ndarray (ny, nx)
+            Concentration, modified in place
+        """
+        if self.cells.size == 0:
+            return
+        flat = c.reshape(-1)
+        values = flat[self.cells]
+        # Mass gained in the step goes back where it entered, mass swept
+        # over by a moving body to the nearest surface of that body
+        surface_mass = np.bincount(self._upstream_surface(flat, values), values - self._ghosts,
+                                   minlength=self.cells.size)
+        surface_mass += np.bincount(self._route, self._carry, minlength=self.cells.size)
+        flat[self.cells] = 0.0
+        if self._targets.size:
+            flat[self._targets] += self._return @ surface_mass
+        self._carry.fill(0.0)
+        self._ghosts.fill(0.0)
+
+    def get_info(self):
+        """Body cell counts and update statistics."""
+        return {
+            'n_bodies': self.n_bodies,
+            'body_cells': int(self.cells.size),
+            'interface_cells': int(self._targets.size),
+            'updates': self.updates,
+        }
+
+    def __repr__(self):
+        return f"ImmersedBodyMask({self.n_bodies} bodies, {self.cells.size} cells)"
+
+
+if __name__ == "__main__":
+    """
+    No-flux check: odor released next to one body must not appear next to
+    another body or behind a wall.
+    """
+    from odor_transport_solver_CN import OdorTransportSolverCN
+
+    def rectangle(x0, x1, y0, y1, n=40):
+        """Section-ordered point cloud of a rectangular body."""
+        xs, ys = np.meshgrid(np.linspace(x0, x1, n), np.linspace(y0, y1, n), indexing='ij')
+        return np.column_stack((xs.ravel(), ys.ravel()))
+
+    nx, ny = 120, 60
+    x_range, y_range = (-3.0, 3.0), (-1.5, 1.5)
+    D, dt = 0.01, 0.05
+
+    def run(bodies, n_steps):
+        solver = OdorTransportSolverCN(x_range, y_range, nx, ny, D)
+        solver.set_initial_condition_gaussian(-0.6, -0.5, 0.15)
+        if bodies:
+            solver.set_immersed_bodies(ImmersedBodyMask(solver.x, solver.y, bodies))
+        mass0 = solver.get_total_mass()
+        zero = np.zeros((ny, nx))
+        for _ in range(n_steps):
+            solver.step_crank_nicolson(zero, zero, dt)
+        return solver, abs(solver.get_total_mass() / mass0 - 1.0)
+
+    print("\n" + "="*80)
+    print("IMMERSED BODIES: no-flux check")
+    print("="*80)
+
+    # Two bodies, odor next to A only: nothing may come out next to B
+    body_a = rectangle(-1.4, -0.8, -0.3, 0.1)
+    body_b = rectangle(1.0, 2.0, 0.2, 0.8)
+    solver, mass_error = run([body_a, body_b], 1)
+    free, _ = run(None, 1)
+    X, Y = np.meshgrid(solver.x, solver.y)
+    near_b = (X > 0.8) & (X < 2.2) & (Y > 0.0) & (Y < 1.0)
+    mass_b, mass_b_free = solver.c[near_b].sum(), free.c[near_b].sum()
+    print(f"[TWO BODIES] mass next to B: {mass_b:.2e} (no bodies: {mass_b_free:.2e}), "
+          f"mass error {mass_error:.1e}")
+    assert mass_b <= 1.01 * mass_b_free + 1e-30
+    assert mass_error < 1e-12
+
+    # Full-height wall between the release and the far side
+    wall = rectangle(0.0, 0.3, -1.7, 1.7)
+    walled, mass_error = run([wall], 40)
+    free, _ = run(None, 40)
+    far = X > 0.3
+    far_wall = walled.c[far].sum() / walled.c.sum()
+    far_free = free.c[far].sum() / free.c.sum()
+    print(f"[WALL] fraction behind the wall: {far_wall:.2e} (no wall: {far_free:.2e}), "
+          f"mass error {mass_error:.1e}")
+    assert far_wall < 1e-6 and far_wall < 1e-2 * far_free
+    assert mass_error < 1e-12
+    print("\nNo-flux check passed")
@@ -0,0 +1,547 @@
+#!/usr/bin/env python3
+"""
+Shared-Memory Domain Decomposition for the Crank-Nicolson Odor Solver
+
+Runs the OdorTransportSolverCN discretization on several CPU cores:
+
+    ∂C/∂t + u·∇C = D ∇²C
+
+The grid is split into horizontal strips of rows, each owned by a
+persistent worker process. All fields (C, velocity, Krylov vectors) live
+in multiprocessing.shared_memory. Every worker writes its own rows only.
+Halo rows are read directly from the neighbouring strips after a barrier,
+which makes the barrier the halo exchange.
+
+Per step:
+
+1. Every worker builds the Crank-Nicolson RHS on its strip (upwind
+   convection + explicit Laplacian), exactly as the serial solver does.
+2. The implicit system (I - θ·Δt·D·L) C^(n+1) = rhs is solved with
+   preconditioned conjugate gradients, warm-started from C^n. Matrix-vector
+   products and dot products are distributed over the strips. The master
+   process only reduces the scalar partial sums.
+3. The preconditioner is additive Schwarz. Each worker solves the
+   operator restricted to its strip extended by `overlap` rows (sparse LU,
+   cached per Δt), and the overlapping pieces are summed. This keeps the
+   preconditioner symmetric, as CG requires.
+
+The result matches the serial direct solver to the Krylov tolerance.
+strong_scaling_report() times the solver for a range of worker counts
+and reports the speedup over the measured serial run.
+"""
+
+import time
+import traceback
+import warnings
+import multiprocessing as mp
+from multiprocessing import shared_memory
+
+import numpy as np
+from scipy.sparse import identity
+from scipy.sparse.linalg import splu
+
+from odor_transport_solver_CN import (
+    OdorTransportSolverCN,
+    UpwindConvectionKernel,
+)
+
+# Shared arrays of shape (ny, nx)
+_FIELD_NAMES = ('c', 'x', 'r', 'z', 'p', 'q', 'u_x', 'u_y')
+
+
+def _split_rows(ny, n_workers):
+    """Contiguous row ranges [r0, r1) of nearly equal size."""
+    bounds = np.linspace(0, ny, n_workers + 1).round().astype(int)
+    return [(int(bounds[w]), int(bounds[w + 1])) for w in range(n_workers)]
+
+
+def _attach(name, shape):
+    shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+
+
+def _strip_worker(conn, barrier, worker, strips, overlap, shm_names, part_shape,
+                  L_ext, nx, ny, dx, dy, diffusion_coeff, theta, boundary_type):
+    """
+    Worker loop for one strip (runs in its own process).
+
+    Commands are (name, argument) tuples from the master. Each reply is
+    ('ok', value), or ('error', traceback) if the command failed.
+    """
+    handles = []
+    try:
+        fields = {}
+        for key in _FIELD_NAMES:
+            shm, array = _attach(shm_names[key], (ny, nx))
+            handles.append(shm)
+            fields[key] = array.reshape(-1)
+        shm, parts = _attach(shm_names['parts'], part_shape)
+        handles.append(shm)
+
+        r0, r1 = strips[worker]
+        e0, e1 = max(r0 - overlap, 0), min(r1 + overlap, ny)
+        own = slice(r0 * nx, r1 * nx)
+        ext = slice(e0 * nx, e1 * nx)
+        n_ext = (e1 - e0) * nx
+
+        # Laplacian rows of the owned cells (global columns) and the
+        # operator restricted to the extended strip
+        L_own = L_ext[(r0 - e0) * nx:(r1 - e0) * nx].tocsr()
+        L_local = L_ext[:, e0 * nx:e1 * nx].tocsc()
+        identity_local = identity(n_ext, format='csc')
+
+        # Upwind convection on the owned rows plus one halo row each side
+        w0, w1 = max(r0 - 1, 0), min(r1 + 1, ny)
+        kernel = UpwindConvectionKernel(w1 - w0, nx, dx, dy)
+        conv_rows = slice(r0 - w0, r1 - w0)
+
+        # Overlapping Schwarz pieces that contribute to the owned rows:
+        # (worker, rows in its extended strip, rows in the owned strip)
+        contributions = []
+        for v, (s0, s1) in enumerate(strips):
+            v0, v1 = max(s0 - overlap, 0), min(s1 + overlap, ny)
+            lo, hi = max(v0, r0), min(v1, r1)
+            if lo < hi:
+                contributions.append((v, slice((lo - v0) * nx, (hi - v0) * nx),
+                                      slice((lo - r0) * nx, (hi - r0) * nx)))
+
+        factorizations = {}
+        alpha = 0.0
+
+        c, x, r, z, p, q = (fields[key] for key in ('c', 'x', 'r', 'z', 'p', 'q'))
+
+        def precondition():
+            # z = Σ_v R_v^T A_v^{-1} R_v r (additive Schwarz)
+            parts[worker, :n_ext] = lu.solve(r[ext])
+            barrier.wait()
+            z_own = z[own]
+            z_own[:] = 0.0
+            for v, src, dst in contributions:
+                z_own[dst] += parts[v, src]
+            return float(np.dot(r[own], z_own))
+
+        while True:
+            command, argument = conn.recv()
+            if command == 'stop':
+                conn.send(('ok', None))
+                break
+
+            if command == 'begin':
+                dt = argument
+                alpha = dt * diffusion_coeff * theta
+                lu = factorizations.get(dt)
+                if lu is None:
+                    lu = splu((identity_local - alpha * L_local).tocsc())
+                    factorizations = {dt: lu}
+
+                c_window = fields['c'].reshape(ny, nx)[w0:w1]
+                conv = kernel(fields['u_x'].reshape(ny, nx)[w0:w1],
+                              fields['u_y'].reshape(ny, nx)[w0:w1], c_window)[conv_rows]
+                lap = L_own @ c
+                rhs = c[own] + dt * conv.reshape(-1) + alpha * lap
+
+                # Warm start x = C^n: r = rhs - (C^n - α·L·C^n)
+                x[own] = c[own]
+                r[own] = rhs - (c[own] - alpha * lap)
+                barrier.wait()
+                rz = precondition()
+                conn.send(('ok', (float(np.dot(rhs, rhs)), float(np.dot(r[own], r[own])), rz)))
+
+            elif command == 'iterate':
+                # p = z + β·p, then q = A·p once every strip of p is updated
+                beta = argument
+                p[own] = z[own] + beta * p[own]
+                barrier.wait()
+                q[own] = p[own] - alpha * (L_own @ p)
+                conn.send(('ok', float(np.dot(p[own], q[own]))))
+
+            elif command == 'update':
+                step_length = argument
+                x[own] += step_length * p[own]
+                r[own] -= step_length * q[own]
+                rr = float(np.dot(r[own], r[own]))
+                barrier.wait()
+                rz = precondition()
+                conn.send(('ok', (rr, rz)))
+
+            elif command == 'finish':
+                c_own = c[own].reshape(r1 - r0, nx)
+                np.maximum(x[own].reshape(r1 - r0, nx), 0.0, out=c_own)
+                if boundary_type == 'dirichlet':
+                    if r0 == 0:
+                        c_own[0] = 0.0
+                    if r1 == ny:
+                        c_own[-1] = 0.0
+                    c_own[:, 0] = 0.0
+                    c_own[:, -1] = 0.0
+                conn.send(('ok', None))
+
+            else:
+                raise ValueError(f"Unknown command '{command}'")
+
+    except Exception:
+        # Release the other workers from any barrier they are waiting at
+        barrier.abort()
+        conn.send(('error', traceback.format_exc()))
+    finally:
+        for shm in handles:
+            shm.close()
+
+
+class ParallelOdorSolverCN:
+    """
+    Crank-Nicolson odor transport decomposed into strips over worker processes.
+
+    Uses the same grid, discretization and diagnostics as OdorTransportSolverCN
+    (a serial instance is kept for the grid, the Laplacian and the
+    diagnostics; its C array is the shared-memory field). Close the solver
+    (or use it as a context manager) to stop the workers and release the
+    shared memory.
+    """
+
+    def __init__(self, x_range, y_range, nx, ny, diffusion_coeff,
+                 boundary_type='neumann', schmidt_number=None, n_workers=None,
+                 overlap=4, solver_tol=1e-10, solver_maxiter=200,
+                 cache_operators=True, operator_cache_dir=None):
+        """
+        Initialize the solver and start the workers.
+
+        Parameters:
+        -----------
+        x_range, y_range : tuple
+            Domain bounds
+        nx, ny : int
+            Number of grid points
+        diffusion_coeff : float
+            Molecular diffusion coefficient D
+        boundary_type : str
+            'neumann' (default), 'dirichlet' or 'periodic'
+        schmidt_number : float, optional
+            Schmidt number Sc = ν/D for reference
+        n_workers : int, optional
+            Worker processes (default: os.cpu_count(), at most ny // 4)
+        overlap : int
+            Rows by which each Schwarz subdomain extends its strip
+        solver_tol : float
+            Relative residual tolerance of the conjugate gradient solve
+        solver_maxiter : int
+            Maximum conjugate gradient iterations per step
+        cache_operators, operator_cache_dir :
+            Passed to OdorTransportSolverCN (Laplacian cache)
+        """
+        import os
+
+        if n_workers is None:
+            n_workers = os.cpu_count() or 1
+        n_workers = max(1, min(int(n_workers), ny // 4))
+
+        self.serial = OdorTransportSolverCN(x_range, y_range, nx, ny, diffusion_coeff,
+                                            boundary_type=boundary_type,
+                                            schmidt_number=schmidt_number,
+                                            cache_operators=cache_operators,
+                                            operator_cache_dir=operator_cache_dir,
+                                            solver_backend='direct')
+        self.nx, self.ny = nx, ny
+        self.n_workers = n_workers
+        self.overlap = overlap
+        self.solver_tol = solver_tol
+        self.solver_maxiter = solver_maxiter
+        self.krylov_iterations = 0
+        self.last_iterations = 0
+        self._closed = False
+
+        self.strips = _split_rows(ny, n_workers)
+        ext_rows = max(min(s1 + overlap, ny) - max(s0 - overlap, 0) for s0, s1 in self.strips)
+        part_shape = (n_workers, ext_rows * nx)
+
+        # Shared fields; the serial solver's C becomes the shared array
+        self._shm = {}
+        self._fields = {}
+        for key in _FIELD_NAMES:
+            shm = shared_memory.SharedMemory(create=True, size=ny * nx * 8)
+            self._shm[key] = shm
+            self._fields[key] = np.ndarray((ny, nx), dtype=np.float64, buffer=shm.buf)
+            self._fields[key][...] = 0.0
+        self._shm['parts'] = shared_memory.SharedMemory(create=True,
+                                                         size=max(1, part_shape[0] * part_shape[1]) * 8)
+        self._fields['c'][...] = self.serial.c
+        self.serial.c = self._fields['c']
+        shm_names = {key: shm.name for key, shm in self._shm.items()}
+
+        context = mp.get_context()
+        barrier = context.Barrier(n_workers)
+        L = self.serial.L
+        self._connections = []
+        self._processes = []
+        for w, (r0, r1) in enumerate(self.strips):
+            e0, e1 = max(r0 - overlap, 0), min(r1 + overlap, ny)
+            parent_conn, child_conn = context.Pipe()
+            process = context.Process(
+                target=_strip_worker,
+                args=(child_conn, barrier, w, self.strips, overlap, shm_names, part_shape,
+                      L[e0 * nx:e1 * nx], nx, ny, self.serial.dx, self.serial.dy,
+                      diffusion_coeff, self.serial.theta, boundary_type),
+                daemon=True)
+            process.start()
+            self._connections.append(parent_conn)
+            self._processes.append(process)
+
+        print(f"[PARALLEL-CN] Domain decomposition: {n_workers} strips of ~{ny // n_workers} rows, "
+              f"Schwarz overlap {overlap}")
+
+    # --------------------------------------------------------
+    # Worker communication
+    # --------------------------------------------------------
+
+    def _broadcast(self, command, argument=None):
+        """Send a command to every worker and collect the replies."""
+        for conn in self._connections:
+            conn.send((command, argument))
+        results = []
+        for w, conn in enumerate(self._connections):
+            status, value = conn.recv()
+            if status == 'error':
+                self.close()
+                raise RuntimeError(f"Worker {w} failed:\n{value}")
+            results.append(value)
+        return results
+
+    def close(self):
+        """Stop the workers and release the shared memory."""
+        if self._closed:
+            return
+        self._closed = True
+        for conn in self._connections:
+            try:
+                conn.send(('stop', None))
+                conn.recv()
+            except (EOFError, OSError, BrokenPipeError):
+                pass
+        for process in self._processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+
+        # Keep a private copy of C so diagnostics still work after closing
+        self.serial.c = np.array(self._fields['c'])
+        self._fields = {}
+        for shm in self._shm.values():
+            shm.close()
+            shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+    # --------------------------------------------------------
+    # Initial conditions and time stepping
+    # --------------------------------------------------------
+
+    @property
+    def c(self):
+        return self.serial.c
+
+    @property
+    def t(self):
+        return self.serial.t
+
+    @property
+    def total_steps(self):
+        return self.serial.total_steps
+
+    def set_initial_condition_gaussian(self, x0, y0, sigma, amplitude=1.0):
+        """Gaussian initial condition (see OdorTransportSolverCN)."""
+        self.serial.set_initial_condition_gaussian(x0, y0, sigma, amplitude)
+        self._fields['c'][...] = self.serial.c
+        self.serial.c = self._fields['c']
+
+    def set_initial_condition_custom(self, concentration_field):
+        """Custom initial condition (see OdorTransportSolverCN)."""
+        self.serial.set_initial_condition_custom(concentration_field)
+        self._fields['c'][...] = self.serial.c
+        self.serial.c = self._fields['c']
+
+    def compute_stable_timestep(self, u_x, u_y, cfl_max=None):
+        return self.serial.compute_stable_timestep(u_x, u_y, cfl_max)
+
+    def step_crank_nicolson(self, u_x, u_y, dt):
+        """
+        Advance one timestep on all strips.
+
+        Parameters:
+        -----------
+        u_x, u_y : ndarray (ny, nx)
+            Velocity field at current time
+        dt : float
+            Timestep size
+        """
+        if self._closed:
+            raise RuntimeError("Solver is closed")
+        self._fields['u_x'][...] = u_x
+        self._fields['u_y'][...] = u_y
+
+        partials = np.array(self._broadcast('begin', float(dt)))
+        bb, rr, rz = partials.sum(axis=0)
+        tol_abs = self.solver_tol * np.sqrt(bb)
+
+        iterations = 0
+        beta = 0.0
+        while np.sqrt(rr) > tol_abs and iterations < self.solver_maxiter:
+            pq = sum(self._broadcast('iterate', beta))
+            step_length = rz / pq
+            rr, rz_new = np.array(self._broadcast('update', step_length)).sum(axis=0)
+            beta = rz_new / rz
+            rz = rz_new
+            iterations += 1
+
+        if np.sqrt(rr) > tol_abs:
+            warnings.warn(f"Parallel CG did not converge: residual {np.sqrt(rr / bb):.2e} "
+                          f"after {iterations} iterations")
+
+        self._broadcast('finish')
+        self.last_iterations = iterations
+        self.krylov_iterations += iterations
+        self.serial.t += dt
+        self.serial.total_steps += 1
+
+    def step_diffusion_only(self, dt):
+        zero = np.zeros((self.ny, self.nx))
+        self.step_crank_nicolson(zero, zero, dt)
+
+    # --------------------------------------------------------
+    # Diagnostics
+    # --------------------------------------------------------
+
+    def get_concentration(self):
+        return self.serial.get_concentration()
+
+    def get_total_mass(self):
+        return self.serial.get_total_mass()
+
+    def get_mass_conservation_error(self):
+        return self.serial.get_mass_conservation_error()
+
+    def get_spreading_width(self):
+        return self.serial.get_spreading_width()
+
+    def get_solver_info(self):
+        info = self.serial.get_solver_info()
+        info['solver_backend'] = 'parallel-cg'
+        info['n_workers'] = self.n_workers
+        info['krylov_iterations'] = self.krylov_iterations
+        info.pop('factorization_cache', None)
+        info.pop('factorization_cache_hits', None)
+        info.pop('factorization_cache_misses', None)
+        return info
+
+    def print_status(self):
+        info = self.get_solver_info()
+        print(f"\n[PARALLEL STATUS] t = {info['time']:.4f}")
+        print(f"  Steps: {info['total_steps']}, workers: {info['n_workers']}")
+        print(f"  CG iterations: {info['krylov_iterations']} "
+              f"({info['krylov_iterations'] / max(info['total_steps'], 1):.1f} per step)")
+        print(f"  Total mass: {info['total_mass']:.6f}")
+        print(f"  Mass error: {info['mass_conservation_error']:.2e}")
+        print(f"  Spreading width: σ = {info['spreading_width']:.4f}")
+
+
+def strong_scaling_report(nx=800, ny=600, worker_counts=None, n_steps=20, dt=0.002,
+                          diffusion_coeff=1e-3, boundary_type='neumann'):
+    """
+    Strong-scaling study: fixed problem, increasing worker count.
+
+    Runs the same n_steps with the serial direct solver and with
+    ParallelOdorSolverCN for each worker count, and reports time per step,
+    speedup over the measured serial run (serial time / parallel time),
+    parallel efficiency (speedup / workers), the mean CG iterations per
+    step and the deviation from the serial result. A speedup below 1 means
+    the parallel solver is slower than the serial one.
+
+    Parameters:
+    -----------
+    nx, ny : int
+        Grid size
+    worker_counts : sequence of int, optional
+        Worker counts to run (default: powers of two up to os.cpu_count())
+    n_steps : int
+        Timed steps per run (one extra untimed step sets up factorizations)
+    dt : float
+        Timestep size
+    diffusion_coeff : float
+        Diffusion coefficient D
+    boundary_type : str
+        'neumann', 'dirichlet' or 'periodic'
+
+    Returns:
+    --------
+    rows : list of dict
+        One entry per run: workers (0 = serial direct), time_per_step,
+        speedup, efficiency, cg_iterations, max_abs_diff
+    """
+    import os
+
+    if worker_counts is None:
+        n_cpu = os.cpu_count() or 1
+        worker_counts = [2**k for k in range(int(np.log2(n_cpu)) + 1)]
+
+    x_range, y_range = (-6.0, 3.0), (-3.0, 3.0)
+    x = np.linspace(*x_range, nx)
+    y = np.linspace(*y_range, ny)
+    X, Y = np.meshgrid(x, y)
+    r = np.sqrt((X + 1.0)**2 + Y**2) + 0.3
+    u_x, u_y = 0.5 - Y / r, (X + 1.0) / r
+
+    def timed_run(solver):
+        solver.set_initial_condition_gaussian(-2.0, 0.0, 0.3)
+        solver.step_crank_nicolson(u_x, u_y, dt)
+        t0 = time.perf_counter()
+        for _ in range(n_steps):
+            solver.step_crank_nicolson(u_x, u_y, dt)
+        return (time.perf_counter() - t0) / n_steps
+
+    serial = OdorTransportSolverCN(x_range, y_range, nx, ny, diffusion_coeff,
+                                   boundary_type=boundary_type)
+    t_serial = timed_run(serial)
+    rows = [{'workers': 0, 'time_per_step': t_serial, 'speedup': 1.0,
+             'efficiency': None, 'cg_iterations': None, 'max_abs_diff': 0.0}]
+
+    for n_workers in worker_counts:
+        with ParallelOdorSolverCN(x_range, y_range, nx, ny, diffusion_coeff,
+                                  boundary_type=boundary_type, n_workers=n_workers) as solver:
+            t_step = timed_run(solver)
+            speedup = t_serial / t_step
+            rows.append({
+                'workers': solver.n_workers,
+                'time_per_step': t_step,
+                'speedup': speedup,
+                'efficiency': speedup / solver.n_workers,
+                'cg_iterations': solver.krylov_iterations / solver.total_steps,
+                'max_abs_diff': float(np.max(np.abs(solver.c - serial.c)))
+            })
+
+    print(f"\n[PARALLEL-CN] Strong scaling, {nx} × {ny} grid, {n_steps} steps")
+    print(f"  {'workers':>8} {'ms/step':>10} {'speedup':>8} {'effic.':>7} "
+          f"{'CG it.':>7} {'max |ΔC|':>10}")
+    for row in rows:
+        label = 'serial' if row['workers'] == 0 else str(row['workers'])
+        speedup = '-' if row['speedup'] is None else f"{row['speedup']:.2f}"
+        efficiency = '-' if row['efficiency'] is None else f"{100 * row['efficiency']:.0f}%"
+        iterations = '-' if row['cg_iterations'] is None else f"{row['cg_iterations']:.1f}"
+        print(f"  {label:>8} {1e3 * row['time_per_step']:>10.2f} {speedup:>8} {efficiency:>7} "
+              f"{iterations:>7} {row['max_abs_diff']:>10.2e}")
+    return rows
+
+
+if __name__ == "__main__":
+    """
+    Strong-scaling report on the production domain.
+    """
+    strong_scaling_report()
@@ -13,10 +13,12 @@ Author: Vinod
 import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib
-import pyvista as pv
 from pathlib import Path
 import sys
 
+from odor_vtk_reader import read_point_cloud, read_vtk
+from odor_frame_store import get_frame_store
+
 # ============================================================
 # PUBLICATION SETTINGS WITH LaTeX
 # ============================================================
@@ -65,6 +67,9 @@ FRAME_START = 0
 FRAME_END = 2500        # Change to 100 or 2500 after testing
 FRAME_SKIP = 100
 
+# Consolidated frames (python odor_frame_store.py . -o frame_store); used when present
+FRAME_STORE = "frame_store"
+
 # FLUID VARIABLE
 FLUID_VARIABLE = 'U_x'      # Options: 'Omega', 'P', 'U_x', 'U_y'
                                # Omega = vorticity (most common for eel swimming)
@@ -147,6 +152,11 @@ def load_eulerian_frame(frame_idx):
     YOUR STRUCTURE: ExportEULERIANData/visit_eulerian_db_XXXX/*.vtk
     """
     
+    # Frame store: the grid samples, memory-mapped
+    store = get_frame_store(FRAME_STORE)
+    if store is not None and store.has_data(FLUID_VARIABLE, frame_idx):
+        return store.grid_points(), store.field(FLUID_VARIABLE, frame_idx).ravel()
+    
     # Try current directory and ExportEULERIANData
     directories = [".", "ExportEULERIANData"]
     
@@ -160,36 +170,18 @@ def load_eulerian_frame(frame_idx):
         if len(vtk_files) == 0:
             continue
         
-        try:
-            meshes = []
-            for vf in vtk_files:
-                try:
-                    mesh = pv.read(str(vf))
-                    meshes.append(mesh)
-                except:
-                    continue
-            
-            if len(meshes) == 0:
-                continue
-            
-            # Combine all mesh pieces
-            combined = meshes[0]
-            for m in meshes[1:]:
-                combined = combined.merge(m)
-            
-            # Check if variable exists
-            if FLUID_VARIABLE not in combined.array_names:
-                print(f"\n    WARNING: '{FLUID_VARIABLE}' not in frame {frame_idx}")
-                print(f"    Available: {combined.array_names}")
-                continue
-            
-            points = combined.points
-            values = combined[FLUID_VARIABLE]
-            
-            return points, values
-            
-        except Exception as e:
+        # Read only FLUID_VARIABLE from each piece and concatenate once
+        points, arrays = read_point_cloud(vtk_files, (FLUID_VARIABLE,))
+        if points is None:
+            continue
+        
+        # Check if variable exists
+        if FLUID_VARIABLE not in arrays:
+            print(f"\n    WARNING: '{FLUID_VARIABLE}' not in frame {frame_idx}")
+            print(f"    Available: {read_vtk(vtk_files[0]).array_names}")
             continue
+        
+        return points, arrays[FLUID_VARIABLE]
     
     return None, None
 
@@ -199,6 +191,10 @@ def load_lagrangian_frame(frame_idx):
     YOUR STRUCTURE: ExportLagrangianData/visit_lagrangian_db__XX__YYYY.vtk
     """
     
+    store = get_frame_store(FRAME_STORE)
+    if store is not None and store.has_data('eel_00', frame_idx):
+        return store.eel_points(frame_idx)
+    
     eels_points = []
     
     # Try to load up to 10 eels (00, 01, 02, 03, ...)
@@ -216,10 +212,9 @@ def load_lagrangian_frame(frame_idx):
             vtk_file = Path(pattern)
             if vtk_file.exists():
                 try:
-                    mesh = pv.read(str(vtk_file))
-                    eels_points.append(mesh.points)
+                    eels_points.append(read_vtk(vtk_file, fields=()).points)
                     break  # Found this eel, move to next
-                except Exception as e:
+                except (OSError, ValueError):
                     continue
         
         # If we didn't find this eel index, stop looking for higher indices
@@ -447,15 +442,6 @@ def main():
     print("PUBLICATION-QUALITY VORTICITY + DARK GRAY EELS VISUALIZATION")
     print("="*80)
     
-    # Check dependencies
-    try:
-        import pyvista
-        print("\n[OK] PyVista is installed")
-    except ImportError:
-        print("\n[ERROR] PyVista not installed!")
-        print("Install with: pip install pyvista")
-        sys.exit(1)
-    
     # Check LaTeX installation
     if USE_LATEX:
         print("[INFO] LaTeX rendering enabled - checking installation...")
@@ -21,8 +21,11 @@ import sys
 import os
 from pathlib import Path
 
+from odor_frame_store import get_frame_store, read_store_frame
+
 # Configuration
 VIZ_DIR = "viz_eel2d_Str"
+FRAME_STORE = "frame_store"  # Consolidated frames (odor_frame_store.py); used when present
 OUTPUT_DIR = "odor_figures"
 FISH_FILES = ["geometry/eel2d_1.vertex", "geometry/eel2d_2.vertex", "geometry/eel2d_3.vertex", "geometry/eel2d_4.vertex"]
 
@@ -65,51 +68,58 @@ def plot_odor_field(iteration, show_velocity=True, show_vorticity=False, save=Tr
     # Create output directory
     Path(OUTPUT_DIR).mkdir(exist_ok=True)
 
-    # Find visit dump file
-    visit_file = f"{VIZ_DIR}/dumps.visit.{iteration:05d}.silo"
-
-    if not os.path.exists(visit_file):
-        print(f"Warning: File {visit_file} not found. Skipping iteration {iteration}")
-        return
-
-    try:
-        # Load data from SILO file
-        with h5py.File(visit_file, 'r') as f:
-            # Load odor concentration (variable name may vary)
-            if 'C' in f.keys():
-                C_data = f['C'][:]
-            elif 'concentration' in f.keys():
-                C_data = f['concentration'][:]
-            else:
-                print(f"Available fields: {list(f.keys())}")
-                print("Odor concentration field not found in output")
-                return
-
-            # Load velocity components
-            if 'U' in f.keys():
-                U_data = f['U'][:]
-                V_data = f['V'][:]
-            elif 'velocity_0' in f.keys():
-                U_data = f['velocity_0'][:]
-                V_data = f['velocity_1'][:]
-            else:
-                U_data = None
-                V_data = None
-
-            # Load vorticity
-            if 'Omega' in f.keys():
-                omega_data = f['Omega'][:]
-            else:
-                omega_data = None
-
-            # Load grid coordinates
-            x = f['x'][:]
-            y = f['y'][:]
-
-    except Exception as e:
-        print(f"Error reading SILO file: {e}")
-        print("Note: This script is designed for post-processing. Run simulation first.")
-        return
+    # Frame store (memory-mapped), else the Silo dump
+    frame = read_store_frame(FRAME_STORE, ('C',), ('U_x', 'U_y', 'Omega'), iteration=iteration)
+    if frame is not None:
+        C_data, x, y = frame['C'], frame['x'], frame['y']
+        U_data, V_data = frame.get('U_x'), frame.get('U_y')
+        omega_data = frame.get('Omega')
+    else:
+        # Find visit dump file
+        visit_file = f"{VIZ_DIR}/dumps.visit.{iteration:05d}.silo"
+
+        if not os.path.exists(visit_file):
+            print(f"Warning: File {visit_file} not found. Skipping iteration {iteration}")
+            return
+
+        try:
+            # Load data from SILO file
+            with h5py.File(visit_file, 'r') as f:
+                # Load odor concentration (variable name may vary)
+                if 'C' in f.keys():
+                    C_data = f['C'][:]
+                elif 'concentration' in f.keys():
+                    C_data = f['concentration'][:]
+                else:
+                    print(f"Available fields: {list(f.keys())}")
+                    print("Odor concentration field not found in output")
+                    return
+
+                # Load velocity components
+                if 'U' in f.keys():
+                    U_data = f['U'][:]
+                    V_data = f['V'][:]
+                elif 'velocity_0' in f.keys():
+                    U_data = f['velocity_0'][:]
+                    V_data = f['velocity_1'][:]
+                else:
+                    U_data = None
+                    V_data = None
+
+                # Load vorticity
+                if 'Omega' in f.keys():
+                    omega_data = f['Omega'][:]
+                else:
+                    omega_data = None
+
+                # Load grid coordinates
+                x = f['x'][:]
+                y = f['y'][:]
+
+        except Exception as e:
+            print(f"Error reading SILO file: {e}")
+            print("Note: This script is designed for post-processing. Run simulation first.")
+            return
 
     # Normalize concentration
     C_normalized = normalize_concentration(C_data)
@@ -192,9 +202,13 @@ def create_animation_frames(iterations=None, max_frames=50):
         Maximum number of frames to generate
     """
     if iterations is None:
-        # Auto-detect iterations from viz directory
-        silo_files = sorted(Path(VIZ_DIR).glob("dumps.visit.*.silo"))
-        iterations = [int(f.stem.split('.')[-1]) for f in silo_files[:max_frames]]
+        # Auto-detect iterations from the frame store or the viz directory
+        store = get_frame_store(FRAME_STORE)
+        if store is not None and 'C' in store.fields:
+            iterations = [int(i) for i in store.iterations[:max_frames]]
+        else:
+            silo_files = sorted(Path(VIZ_DIR).glob("dumps.visit.*.silo"))
+            iterations = [int(f.stem.split('.')[-1]) for f in silo_files[:max_frames]]
 
     print(f"Creating {len(iterations)} animation frames...")
     for i, iteration in enumerate(iterations):
@@ -214,16 +228,20 @@ def analyze_odor_profiles(iteration, y_slice=0.0):
     y_slice : float
         Y-coordinate of the slice
     """
-    visit_file = f"{VIZ_DIR}/dumps.visit.{iteration:05d}.silo"
+    frame = read_store_frame(FRAME_STORE, ('C',), iteration=iteration)
+    if frame is not None:
+        C_data, x, y = frame['C'], frame['x'], frame['y']
+    else:
+        visit_file = f"{VIZ_DIR}/dumps.visit.{iteration:05d}.silo"
 
-    if not os.path.exists(visit_file):
-        print(f"File not found: {visit_file}")
-        return
+        if not os.path.exists(visit_file):
+            print(f"File not found: {visit_file}")
+            return
 
-    with h5py.File(visit_file, 'r') as f:
-        C_data = f['C'][:]
-        x = f['x'][:]
-        y = f['y'][:]
+        with h5py.File(visit_file, 'r') as f:
+            C_data = f['C'][:]
+            x = f['x'][:]
+            y = f['y'][:]
 
     # Find closest y index
     y_idx = np.argmin(np.abs(y[:, 0] - y_slice))
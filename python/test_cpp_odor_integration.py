@@ -23,12 +23,8 @@ import matplotlib.pyplot as plt
 from pathlib import Path
 import sys
 
-try:
-    import pyvista as pv
-    HAVE_PYVISTA = True
-except ImportError:
-    print("[WARNING] PyVista not available - cannot read IBAMR VTK files")
-    HAVE_PYVISTA = False
+from odor_vtk_reader import read_vtk
+from odor_frame_store import get_frame_store
 
 # =============================================================================
 # CONFIGURATION
@@ -37,6 +33,7 @@ except ImportError:
 # Paths to IBAMR output
 VTK_OUTPUT_DIR = "viz_eel2d_Str"
 EULERIAN_DATA_DIR = "ExportEULERIANData"
+FRAME_STORE = "frame_store"  # Consolidated frames (odor_frame_store.py); used when present
 
 # Expected parameters from input2d
 EXPECTED_KAPPA = 1.0e-3  # Diffusion coefficient
@@ -66,10 +63,6 @@ def test_odor_field_exists():
     print("TEST 1: Verify Odor Concentration Field Exists")
     print("="*80)
 
-    if not HAVE_PYVISTA:
-        print("[SKIP] PyVista not available")
-        return False
-
     # Check for VTK output directory
     vtk_dir = Path(VTK_OUTPUT_DIR)
     if not vtk_dir.exists():
@@ -97,7 +90,7 @@ def test_odor_field_exists():
     found_odor = False
     for vtk_file in vtk_files:
         try:
-            mesh = pv.read(str(vtk_file))
+            mesh = read_vtk(vtk_file)
             array_names = mesh.array_names
 
             print(f"[INFO] Available fields in {vtk_file.name}:")
@@ -156,10 +149,6 @@ def test_mass_conservation():
     print("TEST 2: Mass Conservation")
     print("="*80)
 
-    if not HAVE_PYVISTA:
-        print("[SKIP] PyVista not available")
-        return False
-
     print("[INFO] Checking mass conservation across multiple frames...")
     print(f"       Tolerance: {MASS_CONSERVATION_TOL*100}%")
 
@@ -211,6 +200,13 @@ def test_mass_conservation():
 
 def compute_total_mass(frame_idx):
     """Helper function to compute total odor mass in a frame"""
+    store = get_frame_store(FRAME_STORE)
+    if store is not None and store.has_data('C', frame_idx):
+        # Resampled onto the store grid: Mass = Σ C_ij * dx * dy
+        dx, dy = store.spacing
+        total_mass = float(np.sum(store.field('C', frame_idx), dtype=np.float64)) * dx * dy
+        return total_mass if total_mass > 0 else None, float(store.times[store.index(frame_idx)])
+
     vtk_dir = Path(VTK_OUTPUT_DIR)
     frame_dir = vtk_dir / f"visit_dump.{frame_idx:05d}"
 
@@ -224,31 +220,29 @@ def compute_total_mass(frame_idx):
     total_mass = 0.0
     time = frame_idx * 0.0001 * 40  # Assuming dt=0.0001, viz_dump_interval=40
 
+    odor_candidates = ['C', 'c', 'Concentration', 'Q_0']
+
     for vtk_file in vtk_files:
         try:
-            mesh = pv.read(str(vtk_file))
+            # Only the concentration candidates are mapped from the file
+            mesh = read_vtk(vtk_file, fields=odor_candidates)
 
             # Find concentration field
-            odor_field = None
-            for candidate in ['C', 'c', 'Concentration', 'Q_0']:
-                if candidate in mesh.array_names:
-                    odor_field = mesh[candidate]
-                    break
-
-            if odor_field is None:
+            odor_name = next((name for name in odor_candidates if name in mesh), None)
+            if odor_name is None:
                 continue
+            odor_field = np.asarray(mesh[odor_name], dtype=np.float64)
 
             # Compute mass as integral of concentration
-            # For cell data: Mass ≈ Σ C_i * Volume_i
-            if hasattr(mesh, 'cell_sizes'):
-                volumes = mesh.compute_cell_sizes()['Volume']
-                total_mass += np.sum(odor_field * volumes)
+            # For cell data on a patch: Mass = Σ C_i * Area_i
+            if mesh.is_structured and mesh.association(odor_name) == 'cell':
+                total_mass += np.sum(odor_field * mesh.cell_sizes())
             else:
                 # Approximate with uniform grid spacing
                 dx = 0.01  # Approximate cell size
                 total_mass += np.sum(odor_field) * dx * dx
 
-        except Exception as e:
+        except (OSError, ValueError) as e:
             continue
 
     return total_mass if total_mass > 0 else None, time
@@ -17,6 +17,7 @@ Based on: "Collective Chemotactic Behavior in Fish Schools" (arXiv:2408.16136)
 Authors: Maham Kamran, Amirhossein Fardi, Chengyu Li, Muhammad Saif Ullah Khalid
 """
 
+import bisect
 import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib
@@ -25,15 +26,14 @@ import sys
 
 # Import both solvers for comparison
 from odor_transport_solver_CN import OdorTransportSolverCN
+from odor_ensemble_solver import OdorEnsembleSolverCN
+from odor_checkpoint import CheckpointManager
+from odor_resampling import AMRPatchResampler, get_scattered_resampler, load_amr_patches
+from odor_vtk_reader import read_point_cloud, read_vtk
+from odor_frame_store import get_frame_store
+from odor_frame_pipeline import FramePrefetcher
 sys.path.insert(0, str(Path(__file__).parent))
 
-try:
-    import pyvista as pv
-    from scipy.interpolate import griddata
-    HAVE_PYVISTA = True
-except ImportError:
-    print("[WARNING] PyVista not available - running without IBAMR data")
-    HAVE_PYVISTA = False
 
 # ============================================================
 # PUBLICATION SETTINGS
@@ -86,6 +86,15 @@ SOURCE_AMPLITUDE = 1.0
 
 # Time integration
 DT_CRANK_NICOLSON = 0.001  # Can use larger timesteps with implicit scheme
+ADVECTION_SCHEME = 'semi_lagrangian'  # 'upwind' (CFL ≤ 1) or 'semi_lagrangian'
+INTERPOLATION_ORDER = 3  # Semi-Lagrangian interpolation: 1 (bilinear) or 3 (cubic)
+CFL_SEMI_LAGRANGIAN = 5.0  # Replay CFL target with semi-Lagrangian advection
+ADAPTIVE_DT = True  # Error-controlled timesteps (step doubling) between frames
+ADAPTIVE_RTOL = 1e-3  # Relative local error tolerance for adaptive steps
+SOLVER_DTYPE = np.float64  # np.float32 halves field/operator memory on large sweeps
+ACTIVE_TILE_SIZE = None  # e.g. 16: update only tiles the plume reaches (needs 'upwind')
+SOURCE_FROM_INPUT = False  # Add the continuous OdorSourceTerm of input2d
+IMMERSED_BODIES = False  # No-flux fish bodies rasterized from the Lagrangian points
 T_FINAL = 0.4
 
 # Frame processing
@@ -95,6 +104,10 @@ FRAME_SKIP = 10
 
 # Output
 OUTPUT_DIR = "odor_transport_CN_test"
+CHECKPOINT_DIR = "odor_transport_CN_test/restart"  # Solver checkpoints for --resume
+CHECKPOINT_INTERVAL = 150  # Steps between checkpoints (input2d: restart_dump_interval)
+FRAME_STORE = "frame_store"  # Consolidated frames (odor_frame_store.py); used when present
+PREFETCH_FRAMES = 2  # Frames loaded ahead in a background thread while the solver steps (0 = serial)
 
 # ============================================================
 # DATA LOADING FROM IBAMR (same as original)
@@ -102,9 +115,6 @@ OUTPUT_DIR = "odor_transport_CN_test"
 
 def load_eulerian_frame(frame_idx):
     """Load velocity field from IBAMR output"""
-    if not HAVE_PYVISTA:
-        return None, None, None, None
-
     directories = [".", "ExportEULERIANData"]
 
     for base_dir in directories:
@@ -117,43 +127,21 @@ def load_eulerian_frame(frame_idx):
         if len(vtk_files) == 0:
             continue
 
-        try:
-            meshes = []
-            for vf in vtk_files:
-                try:
-                    mesh = pv.read(str(vf))
-                    meshes.append(mesh)
-                except:
-                    continue
-
-            if len(meshes) == 0:
-                continue
-
-            combined = meshes[0]
-            for m in meshes[1:]:
-                combined = combined.merge(m)
-
-            points = combined.points
-
-            if 'U_x' in combined.array_names and 'U_y' in combined.array_names:
-                u_x_points = combined['U_x']
-                u_y_points = combined['U_y']
-            else:
-                continue
-
-            omega = combined.get('Omega', None)
-
-            return points, u_x_points, u_y_points, omega
-
-        except Exception as e:
+        # Native reader: headers parsed, only these arrays mapped, pieces
+        # concatenated once (no pv.read / mesh.merge)
+        points, arrays = read_point_cloud(vtk_files, ('U_x', 'U_y', 'Omega'))
+        if points is None or 'U_x' not in arrays or 'U_y' not in arrays:
             continue
 
+        return points, arrays['U_x'], arrays['U_y'], arrays.get('Omega', None)
+
     return None, None, None, None
 
 def load_lagrangian_frame(frame_idx):
     """Load fish positions"""
-    if not HAVE_PYVISTA:
-        return None
+    store = get_frame_store(FRAME_STORE)
+    if store is not None and store.has_data('eel_00', frame_idx):
+        return store.eel_points(frame_idx)
 
     eels_points = []
 
@@ -167,10 +155,9 @@ def load_lagrangian_frame(frame_idx):
             vtk_file = Path(pattern)
             if vtk_file.exists():
                 try:
-                    mesh = pv.read(str(vtk_file))
-                    eels_points.append(mesh.points)
+                    eels_points.append(read_vtk(vtk_file, fields=()).points)
                     break
-                except:
+                except (OSError, ValueError):
                     continue
 
         if len(eels_points) == eel_idx:
@@ -178,13 +165,53 @@ def load_lagrangian_frame(frame_idx):
 
     return eels_points if len(eels_points) > 0 else None
 
-def interpolate_velocity_to_grid(points, u_x_points, u_y_points, grid_x, grid_y):
-    """Interpolate scattered velocity to regular grid"""
-    u_x_grid = griddata(points[:, :2], u_x_points,
-                        (grid_x, grid_y), method='linear', fill_value=0.0)
-    u_y_grid = griddata(points[:, :2], u_y_points,
-                        (grid_x, grid_y), method='linear', fill_value=0.0)
-    return u_x_grid, u_y_grid
+def interpolate_velocity_to_grid(points, u_x_points, u_y_points, grid_x, grid_y,
+                                 dtype=np.float64):
+    """
+    Interpolate scattered velocity to regular grid (stored as dtype).
+
+    Linear interpolation as griddata, but the triangulation and weights are
+    cached per point set, so frames between regrids cost one sparse mat-vec.
+    """
+    resampler = get_scattered_resampler(points, grid_x, grid_y)
+    return resampler.resample(u_x_points, u_y_points, dtype=dtype)
+
+def load_velocity_on_grid(frame_idx, resampler, dtype=np.float64):
+    """
+    Velocity of a frame on the solver grid, or (None, None) without data.
+
+    Frames in the frame store (FRAME_STORE) are resampled from there.
+    Otherwise the VTK pieces are read as structured AMR patches and
+    composited by resampler (an AMRPatchResampler on the solver grid);
+    pieces without patch structure fall back to the scattered
+    interpolation.
+    """
+    store = get_frame_store(FRAME_STORE)
+    if store is not None and store.has_data('U_x', frame_idx) and store.has_data('U_y', frame_idx):
+        print("  [✓] Loaded velocity from the frame store")
+        return resampler.resample([store.patch(('U_x', 'U_y'), frame_idx)], ('U_x', 'U_y'),
+                                  dtype=dtype)
+
+    for base_dir in [".", "ExportEULERIANData"]:
+        ts_dir = Path(base_dir) / f"visit_eulerian_db__{frame_idx:04d}"
+        if not ts_dir.exists():
+            continue
+        try:
+            patches = load_amr_patches(ts_dir, fields=('U_x', 'U_y'))
+        except ValueError:
+            break   # Not structured: use the point cloud
+        if patches and all('U_x' in p.fields and 'U_y' in p.fields for p in patches):
+            print(f"  [✓] Loaded {len(patches)} AMR patches "
+                  f"({len({p.level for p in patches})} levels)")
+            return resampler.resample(patches, ('U_x', 'U_y'), dtype=dtype)
+
+    points, u_x_points, u_y_points, omega = load_eulerian_frame(frame_idx)
+    if points is None:
+        return None, None
+    print(f"  [✓] Loaded {len(points)} velocity points")
+    X_grid, Y_grid = np.meshgrid(resampler.x, resampler.y)
+    return interpolate_velocity_to_grid(points, u_x_points, u_y_points, X_grid, Y_grid,
+                                        dtype=dtype)
 
 # ============================================================
 # TEST 1: VALIDATION WITH ANALYTICAL SOLUTION
@@ -273,44 +300,46 @@ def test_high_schmidt_number():
     u_x = -gamma * Y / r**2
     u_y = gamma * X / r**2
 
-    results = []
-
-    for Sc in SCHMIDT_NUMBERS:
-        D = NU / Sc
+    # All Schmidt numbers share grid and velocity: advance them as one ensemble
+    diffusion_coeffs = [NU / Sc for Sc in SCHMIDT_NUMBERS]
+    for Sc, D in zip(SCHMIDT_NUMBERS, diffusion_coeffs):
         print(f"\n[Sc = {Sc}] Diffusion coefficient D = {D:.6e}")
 
-        solver = OdorTransportSolverCN(
-            x_range=(X_MIN, X_MAX), y_range=(Y_MIN, Y_MAX),
-            nx=NX, ny=NY,
-            diffusion_coeff=D,
-            schmidt_number=Sc
-        )
+    ensemble = OdorEnsembleSolverCN(
+        x_range=(X_MIN, X_MAX), y_range=(Y_MIN, Y_MAX),
+        nx=NX, ny=NY,
+        diffusion_coeffs=diffusion_coeffs,
+        schmidt_numbers=SCHMIDT_NUMBERS
+    )
+
+    ensemble.set_initial_condition_gaussian(SOURCE_X, SOURCE_Y, SOURCE_SIGMA)
 
-        solver.set_initial_condition_gaussian(SOURCE_X, SOURCE_Y, SOURCE_SIGMA)
+    # Advance to final time
+    t = 0.0
+    dt = DT_CRANK_NICOLSON
+    step = 0
 
-        # Advance to final time
-        t = 0.0
-        dt = DT_CRANK_NICOLSON
-        step = 0
+    while t < T_FINAL:
+        dt_step = min(dt, T_FINAL - t)
+        ensemble.step_crank_nicolson(u_x, u_y, dt_step)
+        t += dt_step
+        step += 1
 
-        while t < T_FINAL:
-            dt_step = min(dt, T_FINAL - t)
-            solver.step_crank_nicolson(u_x, u_y, dt_step)
-            t += dt_step
-            step += 1
+        if step % 50 == 0:
+            print(f"  Step {step}: t = {t:.4f}")
 
-            if step % 50 == 0:
-                print(f"  Step {step}: t = {t:.4f}")
+    results = []
 
-        info = solver.get_solver_info()
+    for k, (Sc, D) in enumerate(zip(SCHMIDT_NUMBERS, diffusion_coeffs)):
+        info = ensemble.get_member_info(k)
         results.append({
             'Sc': Sc,
             'D': D,
-            'concentration': solver.get_concentration(),
+            'concentration': ensemble.get_concentration(k),
             'info': info
         })
 
-        print(f"  [DONE] {step} steps, spreading width σ = {info['spreading_width']:.4f}")
+        print(f"  [Sc = {Sc}] {step} steps, spreading width σ = {info['spreading_width']:.4f}")
         print(f"         Mass error: {info['mass_conservation_error']:.2e}")
 
     # Visualize comparison
@@ -366,18 +395,19 @@ def test_high_schmidt_number():
 # TEST 3: INTEGRATION WITH IBAMR VELOCITY FIELDS
 # ============================================================
 
-def test_with_ibamr_velocity():
+def test_with_ibamr_velocity(resume=False):
     """
     Test Crank-Nicolson solver with actual IBAMR velocity fields.
+
+    Checkpoints go to CHECKPOINT_DIR every CHECKPOINT_INTERVAL steps (at
+    frame boundaries); with resume=True the run continues with the first
+    frame after the one of the latest checkpoint. A fresh run removes the
+    checkpoints of earlier runs.
     """
     print("\n" + "="*80)
     print("TEST 3: Integration with IBAMR Velocity Fields")
     print("="*80)
 
-    if not HAVE_PYVISTA:
-        print("[SKIP] PyVista not available")
-        return True
-
     output_dir = Path(OUTPUT_DIR) / "ibamr_integration"
     output_dir.mkdir(parents=True, exist_ok=True)
 
@@ -392,10 +422,21 @@ def test_with_ibamr_velocity():
         x_range=(X_MIN, X_MAX), y_range=(Y_MIN, Y_MAX),
         nx=NX, ny=NY,
         diffusion_coeff=D,
-        schmidt_number=Sc
+        schmidt_number=Sc,
+        advection_scheme=ADVECTION_SCHEME,
+        interpolation_order=INTERPOLATION_ORDER,
+        dtype=SOLVER_DTYPE,
+        active_tile_size=ACTIVE_TILE_SIZE
     )
 
     solver.set_initial_condition_gaussian(SOURCE_X, SOURCE_Y, SOURCE_SIGMA)
+    if SOURCE_FROM_INPUT:
+        solver.add_sources_from_input(Path(__file__).parent.parent / "input2d")
+    bodies = None
+    if IMMERSED_BODIES:
+        geometry_dir = Path(__file__).parent.parent / "geometry"
+        bodies = solver.set_immersed_bodies(
+            [geometry_dir / f"eel2d_{k}.vertex" for k in range(1, 5)])
 
     # Process frames
     frame_indices = list(range(FRAME_START, min(FRAME_END, 50), FRAME_SKIP))
@@ -403,38 +444,71 @@ def test_with_ibamr_velocity():
 
     results = []
 
-    for idx, frame_idx in enumerate(frame_indices):
+    velocity_resampler = AMRPatchResampler(solver.x, solver.y)
+    checkpoints = CheckpointManager(CHECKPOINT_DIR, interval=CHECKPOINT_INTERVAL)
+    first_idx = 0
+    if not resume:
+        n_removed = checkpoints.clear()
+        if n_removed:
+            print(f"  [INFO] Removed {n_removed} checkpoints of an earlier run")
+    else:
+        meta = checkpoints.resume(solver)
+        if meta is None:
+            print("  [INFO] No checkpoint found, starting from the beginning")
+        else:
+            # Earlier frames: only the diagnostics for the summary plot
+            results = [{'frame': r['frame'], 'time': r['time'], 'info': r}
+                       for r in meta['history']]
+            # The frame list may differ from the checkpointed run's
+            # (FRAME_START/FRAME_SKIP): continue with the next frame after it
+            first_idx = bisect.bisect_right(frame_indices, meta['frame'])
+            print(f"  [INFO] Resuming after frame {meta['frame']}")
+            # Body rasters are not checkpointed: place the bodies as at that frame
+            eels = load_lagrangian_frame(meta['frame']) if bodies is not None else None
+            if eels is not None and len(eels) == bodies.n_bodies:
+                bodies.update(eels)
+
+    def load_frame(frame_idx):
+        """Velocity on the solver grid and fish positions of one frame."""
+        u_x_grid, u_y_grid = load_velocity_on_grid(frame_idx, velocity_resampler, SOLVER_DTYPE)
+        return u_x_grid, u_y_grid, load_lagrangian_frame(frame_idx)
+
+    # Frames k+1 … k+PREFETCH_FRAMES load while the solver advances frame k
+    frames = FramePrefetcher(load_frame, frame_indices[first_idx:], depth=PREFETCH_FRAMES)
+
+    for idx, (frame_idx, (u_x_grid, u_y_grid, eels)) in enumerate(frames, start=first_idx):
         t_target = frame_idx * VIZ_DUMP_INTERVAL * DT_IBAMR
 
         print(f"\n[{idx+1}/{len(frame_indices)}] Frame {frame_idx} (t = {t_target:.4f})")
 
-        # Load velocity field
-        points, u_x_points, u_y_points, omega = load_eulerian_frame(frame_idx)
-
-        if points is None:
+        if u_x_grid is None:
             print("  [WARNING] No velocity data, using zero velocity")
-            u_x_grid = np.zeros((NY, NX))
-            u_y_grid = np.zeros((NY, NX))
-        else:
-            print(f"  [✓] Loaded {len(points)} velocity points")
-            X_grid, Y_grid = np.meshgrid(
-                np.linspace(X_MIN, X_MAX, NX),
-                np.linspace(Y_MIN, Y_MAX, NY)
-            )
-            u_x_grid, u_y_grid = interpolate_velocity_to_grid(
-                points, u_x_points, u_y_points, X_grid, Y_grid
-            )
-
-        # Load fish
-        eels = load_lagrangian_frame(frame_idx)
+            u_x_grid = np.zeros((NY, NX), dtype=SOLVER_DTYPE)
+            u_y_grid = np.zeros((NY, NX), dtype=SOLVER_DTYPE)
+
+        if bodies is not None and eels is not None and len(eels) == bodies.n_bodies:
+            bodies.update(eels)
 
         # Advance solver to target time
-        while solver.t < t_target:
-            dt_step = min(DT_CRANK_NICOLSON, t_target - solver.t)
-            solver.step_crank_nicolson(u_x_grid, u_y_grid, dt_step)
+        steps_before = solver.total_steps
+        if ADAPTIVE_DT:
+            # Step size follows the flow; CFL_SEMI_LAGRANGIAN caps it as an accuracy CFL
+            cfl_max = CFL_SEMI_LAGRANGIAN if ADVECTION_SCHEME == 'semi_lagrangian' else None
+            solver.advance_adaptive(u_x_grid, u_y_grid, t_target,
+                                    rtol=ADAPTIVE_RTOL, cfl_max=cfl_max)
+        else:
+            if ADVECTION_SCHEME == 'semi_lagrangian':
+                # No advective stability limit: step at the accuracy CFL target
+                dt_frame = max(DT_CRANK_NICOLSON,
+                               solver.compute_stable_timestep(u_x_grid, u_y_grid, CFL_SEMI_LAGRANGIAN))
+            else:
+                dt_frame = DT_CRANK_NICOLSON
+
+            solver.advance(u_x_grid, u_y_grid, t_target, dt_frame)
 
         info = solver.get_solver_info()
-        print(f"  [DONE] t = {solver.t:.4f}, σ = {info['spreading_width']:.4f}")
+        print(f"  [DONE] t = {solver.t:.4f}, σ = {info['spreading_width']:.4f} "
+              f"({solver.total_steps - steps_before} steps)")
 
         results.append({
             'frame': frame_idx,
@@ -448,6 +522,18 @@ def test_with_ibamr_velocity():
         if idx % 2 == 0:  # Save every other frame
             visualize_frame(solver, results[-1], output_dir, idx)
 
+        history = [{'frame': r['frame'], 'time': r['time'],
+                    'spreading_width': r['info']['spreading_width'],
+                    'mass_conservation_error': r['info']['mass_conservation_error']}
+                   for r in results]
+        checkpoints.maybe_save(solver, frame=frame_idx, history=history)
+
+    frames.close()
+    checkpoints.close()
+    pipeline = frames.get_info()
+    print(f"\n[PIPELINE] Frame loading: {pipeline['load_time']:.2f} s, solver waited "
+          f"{pipeline['wait_time']:.2f} s ({100 * pipeline['hidden_fraction']:.0f}% overlapped)")
+
     # Summary plot
     plot_spreading_evolution(results, output_dir)
 
@@ -528,8 +614,15 @@ def plot_spreading_evolution(results, output_dir):
 # MAIN
 # ============================================================
 
-def main():
+def main(argv=None):
     """Run all tests"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--resume', action='store_true',
+                        help=f"continue the IBAMR replay from the latest checkpoint in {CHECKPOINT_DIR}")
+    args = parser.parse_args(argv)
+
     print("\n" + "="*80)
     print("CRANK-NICOLSON ODOR TRANSPORT SOLVER: COMPREHENSIVE TESTS")
     print("="*80)
@@ -560,7 +653,7 @@ def main():
         tests_passed.append(("High Schmidt Number", False))
 
     try:
-        tests_passed.append(("IBAMR Integration", test_with_ibamr_velocity()))
+        tests_passed.append(("IBAMR Integration", test_with_ibamr_velocity(resume=args.resume)))
     except Exception as e:
         print(f"[ERROR] Test 3 failed: {e}")
         tests_passed.append(("IBAMR Integration", False))
@@ -32,12 +32,16 @@ import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib
 from matplotlib.animation import FuncAnimation
-import pyvista as pv
 from pathlib import Path
 from scipy.ndimage import laplace
-from scipy.interpolate import griddata
 import sys
 
+from odor_transport_solver_CN import UpwindConvectionKernel
+from odor_resampling import AMRPatchResampler, get_scattered_resampler, load_amr_patches
+from odor_vtk_reader import read_point_cloud, read_vtk
+from odor_frame_store import get_frame_store
+from odor_frame_pipeline import FramePrefetcher
+
 # ============================================================
 # PUBLICATION SETTINGS
 # ============================================================
@@ -95,6 +99,8 @@ FRAME_SKIP = 10
 # Output settings
 OUTPUT_DIR = "odor_transport_test"
 SAVE_FORMAT = 'png'
+FRAME_STORE = "frame_store"  # Consolidated frames (odor_frame_store.py); used when present
+PREFETCH_FRAMES = 2            # Frames loaded ahead while the solvers step (0 = serial)
 
 # ============================================================
 # NUMERICAL SOLVER FOR ODOR TRANSPORT EQUATION
@@ -109,7 +115,8 @@ class OdorTransportSolver:
     and central differences for diffusion.
     """
 
-    def __init__(self, x_range, y_range, nx, ny, diffusion_coeff):
+    def __init__(self, x_range, y_range, nx, ny, diffusion_coeff,
+                 convection_backend='numpy'):
         """
         Initialize solver on regular grid
 
@@ -123,6 +130,9 @@ class OdorTransportSolver:
             Number of grid points
         diffusion_coeff : float
             Molecular diffusion coefficient D
+        convection_backend : str
+            Upwind kernel: 'numpy', 'numba' or 'python' (see
+            UpwindConvectionKernel)
         """
         self.x_min, self.x_max = x_range
         self.y_min, self.y_max = y_range
@@ -142,6 +152,11 @@ class OdorTransportSolver:
         self.c = np.zeros((ny, nx))
         self.t = 0.0
 
+        # Upwind kernel and its work buffer
+        self._convection_kernel = UpwindConvectionKernel(ny, nx, self.dx, self.dy,
+                                                         convection_backend)
+        self._conv_term = np.zeros((ny, nx))
+
         print(f"[SOLVER] Grid: {nx}x{ny}, dx={self.dx:.4f}, dy={self.dy:.4f}")
         print(f"[SOLVER] Diffusion coefficient D = {self.D}")
 
@@ -207,25 +222,10 @@ class OdorTransportSolver:
         2. Diffusion step (central differences)
         """
         # Step 1: Convection (upwind scheme)
-        c_conv = self.c.copy()
-
-        for j in range(1, self.ny - 1):
-            for i in range(1, self.nx - 1):
-                # Upwind derivatives for convection
-                if u_x[j, i] > 0:
-                    dc_dx = (self.c[j, i] - self.c[j, i-1]) / self.dx
-                else:
-                    dc_dx = (self.c[j, i+1] - self.c[j, i]) / self.dx
-
-                if u_y[j, i] > 0:
-                    dc_dy = (self.c[j, i] - self.c[j-1, i]) / self.dy
-                else:
-                    dc_dy = (self.c[j+1, i] - self.c[j, i]) / self.dy
-
-                # Update with convection
-                c_conv[j, i] = self.c[j, i] - dt * (u_x[j, i] * dc_dx + u_y[j, i] * dc_dy)
-
-        self.c = c_conv
+        # c - dt·(u·∇c); boundary values are left unchanged
+        conv = self._convection_kernel(u_x, u_y, self.c, out=self._conv_term)
+        conv *= dt
+        self.c = self.c + conv
 
         # Step 2: Diffusion
         self.step_diffusion_only(dt)
@@ -259,45 +259,29 @@ def load_eulerian_frame(frame_idx):
         if len(vtk_files) == 0:
             continue
 
-        try:
-            meshes = []
-            for vf in vtk_files:
-                try:
-                    mesh = pv.read(str(vf))
-                    meshes.append(mesh)
-                except:
-                    continue
-
-            if len(meshes) == 0:
-                continue
-
-            # Combine mesh pieces
-            combined = meshes[0]
-            for m in meshes[1:]:
-                combined = combined.merge(m)
-
-            points = combined.points
-
-            # Extract velocity components
-            if 'U_x' in combined.array_names and 'U_y' in combined.array_names:
-                u_x_points = combined['U_x']
-                u_y_points = combined['U_y']
-            else:
-                print(f"    WARNING: Velocity components not found in frame {frame_idx}")
-                continue
+        # Read only the needed arrays and concatenate the pieces once
+        points, arrays = read_point_cloud(vtk_files, ('U_x', 'U_y', 'Omega'))
+        if points is None:
+            continue
 
-            # Extract vorticity if available
-            omega = combined.get('Omega', None)
+        # Extract velocity components
+        if 'U_x' not in arrays or 'U_y' not in arrays:
+            print(f"    WARNING: Velocity components not found in frame {frame_idx}")
+            continue
 
-            return points, u_x_points, u_y_points, omega
+        # Extract vorticity if available
+        omega = arrays.get('Omega', None)
 
-        except Exception as e:
-            continue
+        return points, arrays['U_x'], arrays['U_y'], omega
 
     return None, None, None, None
 
 def load_lagrangian_frame(frame_idx):
     """Load fish/eel body positions"""
+    store = get_frame_store(FRAME_STORE)
+    if store is not None and store.has_data('eel_00', frame_idx):
+        return store.eel_points(frame_idx)
+
     eels_points = []
 
     for eel_idx in range(10):
@@ -310,10 +294,9 @@ def load_lagrangian_frame(frame_idx):
             vtk_file = Path(pattern)
             if vtk_file.exists():
                 try:
-                    mesh = pv.read(str(vtk_file))
-                    eels_points.append(mesh.points)
+                    eels_points.append(read_vtk(vtk_file, fields=()).points)
                     break
-                except:
+                except (OSError, ValueError):
                     continue
 
         if len(eels_points) == eel_idx:
@@ -325,6 +308,9 @@ def interpolate_velocity_to_grid(points, u_x_points, u_y_points, grid_x, grid_y)
     """
     Interpolate scattered velocity data to regular grid
 
+    Linear interpolation (as griddata) with the triangulation and the
+    barycentric weights cached per point set (odor_resampling.py).
+
     Parameters:
     -----------
     points : array (N, 3)
@@ -339,14 +325,38 @@ def interpolate_velocity_to_grid(points, u_x_points, u_y_points, grid_x, grid_y)
     u_x_grid, u_y_grid : 2D arrays
         Velocity on regular grid
     """
-    # Interpolate using griddata (linear interpolation)
-    u_x_grid = griddata(points[:, :2], u_x_points,
-                        (grid_x, grid_y), method='linear', fill_value=0.0)
-    u_y_grid = griddata(points[:, :2], u_y_points,
-                        (grid_x, grid_y), method='linear', fill_value=0.0)
+    # One sparse mat-vec for both components
+    resampler = get_scattered_resampler(points, grid_x, grid_y)
+    u_x_grid, u_y_grid = resampler.resample(u_x_points, u_y_points)
 
     return u_x_grid, u_y_grid
 
+def load_amr_velocity(frame_idx, resampler):
+    """
+    Velocity of a frame from its structured AMR patches (no triangulation).
+
+    Returns (u_x_grid, u_y_grid), or (None, None) if the frame has no
+    structured pieces with U_x and U_y. Frames in the frame store
+    (FRAME_STORE) are resampled from there.
+    """
+    store = get_frame_store(FRAME_STORE)
+    if store is not None and store.has_data('U_x', frame_idx) and store.has_data('U_y', frame_idx):
+        print("    ✓ Loaded velocity from the frame store")
+        return resampler.resample([store.patch(('U_x', 'U_y'), frame_idx)], ('U_x', 'U_y'))
+
+    for base_dir in [".", "ExportEULERIANData"]:
+        ts_dir = Path(base_dir) / f"visit_eulerian_db__{frame_idx:04d}"
+        if not ts_dir.exists():
+            continue
+        try:
+            patches = load_amr_patches(ts_dir, fields=('U_x', 'U_y'))
+        except ValueError:
+            return None, None
+        if patches and all('U_x' in p.fields and 'U_y' in p.fields for p in patches):
+            print(f"    ✓ Loaded {len(patches)} AMR patches")
+            return resampler.resample(patches, ('U_x', 'U_y'))
+    return None, None
+
 # ============================================================
 # MAIN TEST FUNCTION
 # ============================================================
@@ -393,37 +403,50 @@ def run_odor_transport_test():
 
     # Frame processing
     frame_indices = list(range(FRAME_START, FRAME_END + 1, FRAME_SKIP))
+    velocity_resampler = AMRPatchResampler(solver_vortex.x, solver_vortex.y)
 
     print(f"\n[TEST] Processing {len(frame_indices)} frames...")
     print("-"*80)
 
     results = []
 
-    for idx, frame_idx in enumerate(frame_indices):
+    def load_frame(frame_idx):
+        """
+        Velocity on the solver grid (structured patches if possible, else
+        the interpolated point cloud), the point cloud, vorticity and fish.
+        """
+        u_x_grid, u_y_grid = load_amr_velocity(frame_idx, velocity_resampler)
+        points, omega = None, None
+        if u_x_grid is None:
+            points, u_x_points, u_y_points, omega = load_eulerian_frame(frame_idx)
+            if points is not None:
+                # Interpolate to regular grid
+                u_x_grid, u_y_grid = interpolate_velocity_to_grid(
+                    points, u_x_points, u_y_points,
+                    solver_vortex.X, solver_vortex.Y
+                )
+        return u_x_grid, u_y_grid, points, omega, load_lagrangian_frame(frame_idx)
+
+    # Frames k+1 … k+PREFETCH_FRAMES load while both solvers advance frame k
+    frames = FramePrefetcher(load_frame, frame_indices, depth=PREFETCH_FRAMES)
+
+    for idx, (frame_idx, (u_x_grid, u_y_grid, points, omega, eels)) in enumerate(frames):
         t_ibamr = frame_idx * VIZ_DUMP_INTERVAL * DT_IBAMR
 
         print(f"\n[{idx+1}/{len(frame_indices)}] Frame {frame_idx} (t* = {t_ibamr:.3f})")
 
-        # Load velocity field from IBAMR
-        points, u_x_points, u_y_points, omega = load_eulerian_frame(frame_idx)
-
-        if points is None:
+        if u_x_grid is None:
             print("    ⚠ No fluid data - using zero velocity")
             u_x_grid = np.zeros((NY, NX))
             u_y_grid = np.zeros((NY, NX))
+        elif points is None:
+            print(f"    ✓ Resampled to {NX}x{NY} grid")
         else:
             print(f"    ✓ Loaded {len(points)} velocity points")
-            # Interpolate to regular grid
-            u_x_grid, u_y_grid = interpolate_velocity_to_grid(
-                points, u_x_points, u_y_points,
-                solver_vortex.X, solver_vortex.Y
-            )
             print(f"    ✓ Interpolated to {NX}x{NY} grid")
             print(f"    ✓ Velocity range: u_x ∈ [{np.min(u_x_grid):.3f}, {np.max(u_x_grid):.3f}]")
             print(f"                      u_y ∈ [{np.min(u_y_grid):.3f}, {np.max(u_y_grid):.3f}]")
 
-        # Load fish positions
-        eels = load_lagrangian_frame(frame_idx)
         if eels:
             print(f"    ✓ Loaded {len(eels)} fish bodies")
 
@@ -484,7 +507,11 @@ def run_odor_transport_test():
         # Visualize
         visualize_comparison(solver_vortex, solver_diffusion, results[-1], output_dir, idx)
 
+    frames.close()
+    pipeline = frames.get_info()
     print("-"*80)
+    print(f"[PIPELINE] Frame loading: {pipeline['load_time']:.2f} s, solvers waited "
+          f"{pipeline['wait_time']:.2f} s ({100 * pipeline['hidden_fraction']:.0f}% overlapped)")
     print("\n[COMPLETE] Odor transport test finished!")
     print(f"Output directory: {output_dir}/")
 
@@ -670,12 +697,11 @@ def main():
 
     # Check dependencies
     try:
-        import pyvista
         import scipy
-        print("\n[✓] Dependencies: PyVista, SciPy")
+        print("\n[✓] Dependencies: SciPy")
     except ImportError as e:
         print(f"\n[✗] Missing dependency: {e}")
-        print("Install with: pip install pyvista scipy")
+        print("Install with: pip install scipy")
         sys.exit(1)
 
     # Run test